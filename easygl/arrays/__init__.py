@@ -30,3 +30,5 @@
 from .datatypes import *
 from .primitives import *
 from .arraybuffers import *
+from .baking import *
+from .cache import *
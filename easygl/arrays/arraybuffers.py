@@ -27,88 +27,783 @@
 #
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 from contextlib import contextmanager
+from array import array
+import ctypes
+import weakref
 
 import OpenGL.GL as GL
-from .primitives import VertexArrayData
+from .primitives import VertexArrayData, VertexLayout, VertexArena, IndexData, PackedPrimitives, _index_dtype
 from .datatypes import DTypeInfo
 from ..shaders import ShaderProgram
-from typing import Union, Optional
+from ..glstate import gl_state
+from ..resources import GLHandle, GLObjectPool, BUFFER, VERTEX_ARRAY, buffer_pool
+from typing import Union, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 __all__ = [
+    'StreamingVertexArray',
     'VertexArray',
 ]
 
 
+class _ArrayObjects(object):
+    __slots__ = 'label', 'vertex_array', 'buffer', 'elements', 'instances', 'capacity', 'sources', 'users', \
+                'parent', '__weakref__'
+
+    # The GL objects behind one or more VertexArray objects; they are deleted when the last user releases
+    # them, or (through the handles' finalizers) once nothing references this object anymore.
+
+    def __init__(self, sources=None, label=None):
+        # type: (Optional[tuple], Optional[str]) -> None
+        self.label = label
+        self.vertex_array = None    # type: Optional[GLHandle]
+        self.buffer = None          # type: Optional[GLHandle]
+        self.elements = None        # type: Optional[GLHandle]
+        self.instances = None       # type: Optional[GLHandle]
+        self.capacity = 0
+        # kept so that the ids in the cache key are not reused while the entry exists
+        self.sources = sources
+        self.users = 0
+        # the objects whose buffers this VAO reads (see VertexArray._own_vertex_array), used until released
+        self.parent = None      # type: Optional[_ArrayObjects]
+
+    def handle(self, kind, name, size=0, pool=None, pool_key=None):
+        # type: (str, int, int, Optional[GLObjectPool], Optional[int]) -> GLHandle
+        return GLHandle(self, kind, name, size, pool, pool_key, self.label)
+
+    def release(self):
+        # type: () -> None
+        for handle in (self.vertex_array, self.buffer, self.elements, self.instances):
+            if handle is not None:
+                handle.release()
+        parent = self.parent
+        if parent is not None:
+            self.parent = None
+            parent.users -= 1
+            if parent.users == 0:
+                parent.release()
+
+
+# VAOs (with their buffers) shared by the VertexArray objects drawing the same data with programs linked
+# against the same layout: {(layout signature, data sources): _ArrayObjects}
+_vao_cache = weakref.WeakValueDictionary()
+
+
+def _shares_locations(program, layout):
+    # type: (ShaderProgram, VertexLayout) -> bool
+    locations = program.attribute_locations   # type: Optional[dict]
+    if locations is None:
+        return False
+    return all(locations.get(name) == location for name, location in layout.attribute_locations().items())
+
+
+def _attribute_pointers(program, layout, num_vertices, divisor=0):
+    # type: (ShaderProgram, VertexLayout, int, int) -> None
+    # Describes the layout of the buffer bound to GL_ARRAY_BUFFER to the bound VAO. Matrix attributes
+    # take one location per column. Locations bound at link time are used as they are; otherwise they
+    # are queried, and attributes the program does not use are skipped.
+    locations = program.attribute_locations   # type: Optional[dict]
+    for name, dtype in zip(layout.names, layout.dtypes):   # type: str, DTypeInfo
+        if locations is not None and name in locations:
+            attrib_location = locations[name]
+        else:
+            attrib_location = GL.glGetAttribLocation(program.id, name)
+        if attrib_location < 0:
+            continue
+        offset = layout.attribute_offset(name, num_vertices)
+        stride = layout.attribute_stride(name)
+        columns, size = dtype.columns
+        column_size = dtype.byte_size // columns
+        for column in range(columns):
+            location = attrib_location + column
+            GL.glEnableVertexAttribArray(location)
+            GL.glVertexAttribPointer(location, size, dtype.gl_size, dtype.normalized, stride,
+                                     GL.GLvoidp(offset + column * column_size))
+            if divisor:
+                GL.glVertexAttribDivisor(location, divisor)
+
+
+def _gl_data(data):
+    # type: (Union[bytes, bytearray, memoryview]) -> Union[bytes, ctypes.Array]
+    # PyOpenGL uploads bytes objects as they are, but garbles bytearray and memoryview ones; those are
+    # passed as an ndarray (or without NumPy, a ctypes array) over the same memory instead.
+    if not isinstance(data, (bytearray, memoryview)):
+        return data
+    view = memoryview(data).cast('B')
+    if np is not None:
+        return np.frombuffer(view, np.uint8)
+    if view.readonly:
+        return bytes(view)
+    return (ctypes.c_char * len(view)).from_buffer(view)
+
+
+def _gl_ints(values):
+    # type: (Union[array, Sequence[int]]) -> ctypes.Array
+    # A GLint array over 'values'; 'i' arrays, memoryviews and int32 NumPy arrays are used without copying,
+    # unless they're read-only (e.g. over a memory-mapped file): ctypes can only copy those.
+    if np is not None and isinstance(values, np.ndarray):
+        values = np.ascontiguousarray(values, dtype=np.int32)
+        if not values.flags.writeable:
+            return (GL.GLint * len(values)).from_buffer_copy(values)
+        return (GL.GLint * len(values)).from_buffer(values)
+    if isinstance(values, memoryview) and values.format == 'i' and values.c_contiguous:
+        if values.readonly:
+            return (GL.GLint * len(values)).from_buffer_copy(values)
+        return (GL.GLint * len(values)).from_buffer(values)
+    if isinstance(values, array) and values.typecode == 'i':
+        return (GL.GLint * len(values)).from_buffer(values)
+    return (GL.GLint * len(values))(*values)
+
+
+def _multi_draw_arrays(mode, firsts, counts):
+    # type: (int, Union[array, Sequence[int]], Union[array, Sequence[int]]) -> None
+    if len(firsts) != len(counts):
+        raise ValueError("'firsts' and 'counts' arguments must have the same length.")
+    if len(firsts) > 0:
+        GL.glMultiDrawArrays(mode, _gl_ints(firsts), _gl_ints(counts), len(firsts))
+
+
 class VertexArray(object):
 
+    # dirty ranges closer than this (in bytes) are uploaded together, along with the clean bytes between them
+    MERGE_GAP = 256
+
+    # vertex buffers up to this size (in bytes) are pooled, rounded up to their size class; larger ones, where
+    # the rounding could waste up to as much memory again, are allocated at their exact size
+    POOLED_SIZE = 64 * 1024
+
     def __init__(self, arraydescriptor, data, shaderprogram):
-        # type: (VertexArrayData, str, ShaderProgram) -> None
-        # Create a new VAO (Vertex Array Object) and bind it
-        vertex_array_object = GL.glGenVertexArrays(1)
-        GL.glBindVertexArray(vertex_array_object)
+        # type: (VertexArrayData, Union[str, Sequence[str], None], ShaderProgram) -> None
+        # A primitive name gives a VertexArray of that primitive alone; a sequence of names (or None, for
+        # all of them) packs the primitives into a single buffer, drawn by name through their ranges.
+        if isinstance(data, str):
+            arena = arraydescriptor.arena(data)   # type: Optional[VertexArena]
+            buffer = arraydescriptor[data]
+            index_data = arraydescriptor.index_data(data)   # type: Optional[IndexData]
+            ranges = {}
+            index_ranges = {}
+            sources = buffer, index_data
+        else:
+            arena = None
+            packed = arraydescriptor.pack(data)   # type: PackedPrimitives
+            buffer = packed.data
+            index_data = packed.index_data
+            ranges = packed.ranges
+            index_ranges = packed.index_ranges
+            sources = tuple(source for name in ranges
+                            for source in (arraydescriptor[name], arraydescriptor.index_data(name)))
 
-        # Generate buffers to hold our vertices
-        vertex_buffer = GL.glGenBuffers(1)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, vertex_buffer)
+        layout = arraydescriptor.layout   # type: VertexLayout
+        stride = layout.stride
+        num_bytes = len(buffer)
+        num_vertices = num_bytes // stride
+
+        # Programs linked against this layout agree on its attribute locations, so they all can draw the
+        # same data through a single VAO. Changes to the shared vertex data are seen by all of them; instances
+        # and strips are not shared (see _own_vertex_array).
+        key = None
+        if arena is None and _shares_locations(shaderprogram, layout):
+            key = (layout.names, layout.dtypes, layout.planar, tuple(map(id, sources)))
 
-        stride = arraydescriptor.stride
-        # for (name, primitive) in args:
-        #     stride += primitive.sizeof
+        objects = _vao_cache.get(key) if key is not None else None   # type: Optional[_ArrayObjects]
+        if objects is None:
+            objects = _ArrayObjects(sources, data if isinstance(data, str) else ','.join(ranges))
 
-        offset = 0
-        for name in arraydescriptor.descriptor:
-            attrib_location = GL.glGetAttribLocation(shaderprogram.id, name)
-            GL.glEnableVertexAttribArray(attrib_location)
+            # Create a new VAO (Vertex Array Object) and bind it
+            vertex_array_object = GL.glGenVertexArrays(1)
+            gl_state.bind_vertex_array(vertex_array_object)
+            objects.vertex_array = objects.handle(VERTEX_ARRAY, vertex_array_object)
 
-            dtype = arraydescriptor.descriptor[name]   # type: DTypeInfo
+            # Send the data over to the buffer
+            if arena is not None:
+                # reserve the arena's whole capacity so that it can be filled up without reallocating
+                capacity = arena.byte_capacity
+                vertex_buffer = GL.glGenBuffers(1)
+                gl_state.bind_array_buffer(vertex_buffer)
+                GL.glBufferData(GL.GL_ARRAY_BUFFER, capacity, None, GL.GL_DYNAMIC_DRAW)
+                objects.buffer = objects.handle(BUFFER, vertex_buffer, capacity)
+            elif num_bytes <= self.POOLED_SIZE:
+                # small buffers come in power of two size classes, so released ones can be reused by others
+                capacity = GLObjectPool.size_class(num_bytes)
+                vertex_buffer = buffer_pool.acquire(capacity)
+                if vertex_buffer is None:
+                    vertex_buffer = GL.glGenBuffers(1)
+                    gl_state.bind_array_buffer(vertex_buffer)
+                    GL.glBufferData(GL.GL_ARRAY_BUFFER, capacity, None, GL.GL_DYNAMIC_DRAW)
+                else:
+                    gl_state.bind_array_buffer(vertex_buffer)
+                objects.buffer = objects.handle(BUFFER, vertex_buffer, capacity, buffer_pool, capacity)
+            else:
+                # larger ones take their exact size, and are deleted when released
+                capacity = num_bytes
+                vertex_buffer = GL.glGenBuffers(1)
+                gl_state.bind_array_buffer(vertex_buffer)
+                GL.glBufferData(GL.GL_ARRAY_BUFFER, capacity, None, GL.GL_DYNAMIC_DRAW)
+                objects.buffer = objects.handle(BUFFER, vertex_buffer, capacity)
+            if num_bytes > 0:
+                GL.glBufferSubData(GL.GL_ARRAY_BUFFER, 0, num_bytes, _gl_data(buffer))
+            objects.capacity = capacity
 
             # Describe the attribute data layout in the buffer
-            GL.glVertexAttribPointer(attrib_location, dtype.size, dtype.gl_size, False, stride, GL.GLvoidp(offset))
-            offset += dtype.byte_size
+            _attribute_pointers(shaderprogram, layout, num_vertices)
 
-        # Send the data over to the buffer
-        num_bytes = len(arraydescriptor[data])
-        GL.glBufferData(GL.GL_ARRAY_BUFFER, num_bytes, arraydescriptor[data], GL.GL_DYNAMIC_DRAW)
-        # print("num_bytes:", num_bytes)
+            # The element buffer binding is part of the VAO state, so it must be bound before the VAO is unbound
+            element_buffer = None
+            if index_data is not None:
+                element_buffer = GL.glGenBuffers(1)
+                GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, element_buffer)
+                GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, len(index_data.data), _gl_data(index_data.data),
+                                GL.GL_STATIC_DRAW)
+                objects.elements = objects.handle(BUFFER, element_buffer, len(index_data.data))
 
-        # Unbind the VAO first (Important)
-        GL.glBindVertexArray(0)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+            # Unbind the VAO first (Important)
+            gl_state.bind_vertex_array(0)
+            if key is not None:
+                _vao_cache[key] = objects
+        objects.users += 1
 
-        self.array = arraydescriptor[data]
-        self.vao = vertex_array_object
-        self.vbo = vertex_buffer
+        self.array = buffer
+        self.vao = objects.vertex_array.name
+        self.vbo = objects.buffer.name
+        self.ebo = objects.elements.name if objects.elements is not None else None
+        self.ibo = objects.instances.name if objects.instances is not None else None
+        self.ranges = ranges
+        self.index_ranges = index_ranges
         self._program = shaderprogram
-        self._num_vertices = num_bytes // stride
+        self._layout = layout
+        self._num_vertices = num_vertices
+        self._index_data = index_data
+        self._arena = arena
+        self._capacity = objects.capacity
+        self._objects = objects
+        self._key = key
+        self._mirror = None     # type: Optional[bytearray]
+        self._dirty = []        # type: list
+        self._instance_layout = None    # type: Optional[VertexLayout]
+        self._num_instances = 0
+        self._instance_capacity = 0
+        self._divisor = 1
+        self._restart_index = 0
+
+    def release(self):
+        # type: () -> None
+        # Deletes the GL objects now, unless other VertexArray objects still share them.
+        objects = self._objects
+        if objects is None:
+            return
+        self._objects = None
+        self.vao = self.vbo = self.ebo = self.ibo = None
+        objects.users -= 1
+        if objects.users == 0:
+            objects.release()
 
     def update_data(self, offset, data=None):
         # type: (int, Optional[Union[bytes, bytearray]]) -> None
-        GL.glBindVertexArray(self.vao)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vbo)
+        gl_state.bind_array_buffer(self.vbo)
 
         if data is None:
             data = self.array
-        GL.glBufferSubData(GL.GL_ARRAY_BUFFER, offset, len(data), data)
+        GL.glBufferSubData(GL.GL_ARRAY_BUFFER, offset, len(data), _gl_data(data))
+
+    def update_attribute(self, name, data, first=0):
+        # type: (str, Union[bytes, bytearray, memoryview], int) -> None
+        if not self._layout.planar:
+            raise TypeError("update_attribute() requires a planar VertexArrayData layout.")
+        size = self._layout.dtype(name).byte_size
+        if first < 0 or first * size + len(data) > self._num_vertices * size:
+            raise ValueError("'{}' attribute data does not fit in the buffer.".format(name))
+
+        # the attribute region is contiguous, so the whole stream goes in a single call
+        offset = self._layout.attribute_offset(name, self._num_vertices) + first * size
+        gl_state.bind_array_buffer(self.vbo)
+        GL.glBufferSubData(GL.GL_ARRAY_BUFFER, offset, len(data), _gl_data(data))
+
+    @property
+    def mirror(self):
+        # type: () -> bytearray
+        # The CPU copy of the buffer, made on first use; writes to it are tracked and uploaded by flush().
+        if self._mirror is None:
+            self._mirror = bytearray(self.array)
+            self.array = self._mirror
+        return self._mirror
+
+    @property
+    def dirty(self):
+        # type: () -> bool
+        return len(self._dirty) > 0
+
+    def mark_dirty(self, first, count=1):
+        # type: (int, int) -> None
+        if self._layout.planar:
+            raise TypeError("mark_dirty() requires an interleaved VertexArrayData layout.")
+        if first < 0 or first + count > self._num_vertices:
+            raise IndexError("vertex range [{}, {}) is out of the VertexArray bounds.".format(first, first + count))
+        if self._mirror is None:
+            # dirty ranges are uploaded from the mirror, so it's made now, while it still holds the current data
+            self._mirror = bytearray(self.array)
+            self.array = self._mirror
+        stride = self._layout.stride
+        self._dirty.append((first * stride, (first + count) * stride))
+
+    def set_vertex(self, index, **attrs):
+        # type: (int, ...) -> None
+        # Only the attributes given are written; the others keep the vertex's current values.
+        layout = self._layout
+        if layout.planar:
+            raise TypeError("set_vertex() requires an interleaved VertexArrayData layout.")
+        self.mark_dirty(index)
+        mirror = self.mirror
+        position = index * layout.stride
+        for name, dtype, offset in zip(layout.names, layout.dtypes, layout.offsets):   # type: str, DTypeInfo, int
+            if name not in attrs:
+                continue
+            value = attrs[name]
+            if dtype.normalized:
+                value = dtype.quantize(value)
+            elif dtype.size == 1:
+                value = value,
+            dtype.packer().pack_into(mirror, position + offset, *value)
+
+    def write_vertices(self, first, data):
+        # type: (int, Union[bytes, bytearray, memoryview]) -> None
+        if self._layout.planar:
+            raise TypeError("write_vertices() requires an interleaved VertexArrayData layout.")
+        stride = self._layout.stride
+        if len(data) % stride != 0:
+            raise ValueError("data size is not a multiple of the vertex stride ({}).".format(stride))
+        self.mark_dirty(first, len(data) // stride)
+        self.mirror[first * stride:first * stride + len(data)] = data
+
+    def view(self, attribute=None):
+        # type: (Optional[str]) -> np.ndarray
+        # An ndarray over the mirror (see VertexLayout.view); mark_dirty() the vertices written through it.
+        if self._layout.planar:
+            raise TypeError("view() requires an interleaved VertexArrayData layout.")
+        return self._layout.view(self.mirror, attribute)
+
+    def flush(self):
+        # type: () -> int
+        # Uploads the dirty ranges, merged into as few glBufferSubData calls as possible, and returns
+        # the number of calls made. Nothing is uploaded if nothing changed.
+        if not self._dirty:
+            return 0
+        ranges = sorted(self._dirty)
+        self._dirty = []
+
+        merged = [list(ranges[0])]
+        for start, end in ranges[1:]:
+            last = merged[-1]
+            if start <= last[1] + self.MERGE_GAP:
+                last[1] = max(last[1], end)
+            else:
+                merged.append([start, end])
+
+        data = memoryview(self._mirror)
+        gl_state.bind_array_buffer(self.vbo)
+        for start, end in merged:
+            GL.glBufferSubData(GL.GL_ARRAY_BUFFER, start, end - start, _gl_data(data[start:end]))
+        return len(merged)
+
+    def sync_arena(self):
+        # type: () -> None
+        if self._arena is None:
+            raise TypeError("VertexArray object is not backed by a VertexArena.")
+        arena = self._arena
+        num_bytes = arena.byte_size
+        gl_state.bind_array_buffer(self.vbo)
 
-        GL.glBindVertexArray(0)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        # The buffer is reallocated only when the arena outgrew it, and then to the arena's (doubled)
+        # capacity, so the number of reallocations stays logarithmic in the number of vertices.
+        if arena.byte_capacity > self._capacity:
+            self._capacity = arena.byte_capacity
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, self._capacity, None, GL.GL_DYNAMIC_DRAW)
+            self._objects.buffer.resize(self._capacity)
+        if num_bytes > 0:
+            GL.glBufferSubData(GL.GL_ARRAY_BUFFER, 0, num_bytes, _gl_data(arena.data))
 
-    def draw_arrays(self, mode, count=None):
+        self.array = arena.data
+        self._num_vertices = len(arena)
+        # the arena is the source of truth now; pending mirror writes are superseded
+        self._mirror = None
+        self._dirty = []
+
+    def _own_vertex_array(self):
         # type: () -> None
+        # Instance and element buffers are VAO state: before attaching either, a VertexArray sharing its
+        # VAO gets one of its own, reading the same vertex (and index) buffers, and the VAO it leaves (or
+        # keeps, when it was the only user) is no longer handed out to new VertexArray objects.
+        objects = self._objects
+        if self._key is not None and _vao_cache.get(self._key) is objects and objects.users == 1:
+            del _vao_cache[self._key]
+        self._key = None
+        if objects.users == 1:
+            return
+
+        own = _ArrayObjects(label=objects.label)
+        vertex_array_object = GL.glGenVertexArrays(1)
+        gl_state.bind_vertex_array(vertex_array_object)
+        own.vertex_array = own.handle(VERTEX_ARRAY, vertex_array_object)
+        gl_state.bind_array_buffer(self.vbo)
+        _attribute_pointers(self._program, self._layout, self._num_vertices)
+        if self.ebo is not None:
+            GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        gl_state.bind_vertex_array(0)
+        # the buffers stay with the shared objects, which this one keeps a user of
+        own.parent = objects
+        own.capacity = objects.capacity
+        own.users = 1
+
+        self._objects = own
+        self.vao = vertex_array_object
+        self.ibo = None
+
+    @property
+    def instance_count(self):
+        # type: () -> int
+        return self._num_instances
+
+    def set_instances(self, arraydescriptor, data, divisor=1):
+        # type: (VertexArrayData, Union[str, bytes, bytearray, memoryview], int) -> None
+        # Attaches a second buffer holding per-instance attributes, as described by arraydescriptor's
+        # layout; 'data' is one of its primitives or the raw records. Each record feeds 'divisor' instances.
+        layout = arraydescriptor.layout   # type: VertexLayout
+        buffer = arraydescriptor[data] if isinstance(data, str) else data
+        num_instances = len(buffer) // layout.stride
+
+        self._own_vertex_array()
+        gl_state.bind_vertex_array(self.vao)
+        if self.ibo is None:
+            self.ibo = GL.glGenBuffers(1)
+            self._objects.instances = self._objects.handle(BUFFER, self.ibo)
+        gl_state.bind_array_buffer(self.ibo)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, len(buffer), _gl_data(buffer), GL.GL_DYNAMIC_DRAW)
+        self._objects.instances.resize(len(buffer))
+        _attribute_pointers(self._program, layout, num_instances, divisor)
+        gl_state.bind_vertex_array(0)
+
+        self._instance_layout = layout
+        self._num_instances = num_instances * divisor
+        self._divisor = divisor
+        self._instance_capacity = len(buffer)
+
+    def update_instances(self, data, first=0):
+        # type: (Union[bytes, bytearray, memoryview], int) -> None
+        if self._instance_layout is None:
+            raise TypeError("VertexArray object has no instance buffer.")
+        if self._instance_layout.planar:
+            raise TypeError("update_instances() requires an interleaved instance layout.")
+        # Always in place; set_instances() replaces the buffer (and the instance count) instead.
+        stride = self._instance_layout.stride
+        if len(data) % stride != 0:
+            raise ValueError("data size is not a multiple of the instance stride ({}).".format(stride))
+        offset = first * stride
+        if first < 0 or offset + len(data) > self._instance_capacity:
+            raise ValueError("instance data does not fit in the instance buffer ({} bytes).".format(
+                self._instance_capacity))
+        gl_state.bind_array_buffer(self.ibo)
+        GL.glBufferSubData(GL.GL_ARRAY_BUFFER, offset, len(data), _gl_data(data))
+
+    def draw_arrays_instanced(self, mode, instances=None, count=None, first=0):
+        # type: (int, Optional[int], Optional[int], int) -> None
         if count is None:
-            count = self._num_vertices
-        GL.glBindVertexArray(self.vao)
-        GL.glDrawArrays(mode, 0, count)
-        GL.glBindVertexArray(self.vao)
+            count = self._num_vertices - first
+        if instances is None:
+            instances = self._num_instances
+        if self._dirty:
+            self.flush()
+        gl_state.bind_vertex_array(self.vao)
+        GL.glDrawArraysInstanced(mode, first, count, instances)
+
+    def draw_elements_instanced(self, mode, instances=None, count=None, first=0):
+        # type: (int, Optional[int], Optional[int], int) -> None
+        if self._index_data is None:
+            raise TypeError("VertexArray object has no index buffer.")
+        if count is None:
+            count = self._index_data.count - first
+        if instances is None:
+            instances = self._num_instances
+        dtype = self._index_data.dtype   # type: DTypeInfo
+        if self._dirty:
+            self.flush()
+        gl_state.bind_vertex_array(self.vao)
+        GL.glDrawElementsInstanced(mode, count, dtype.gl_size, GL.GLvoidp(first * dtype.byte_size), instances)
+
+    def draw_arrays(self, mode, count=None, first=0):
+        # type: (int, Optional[int], int) -> None
+        if count is None:
+            count = self._num_vertices - first
+        if self._dirty:
+            self.flush()
+        gl_state.bind_vertex_array(self.vao)
+        GL.glDrawArrays(mode, first, count)
+
+    def draw_elements(self, mode, count=None, first=0):
+        # type: (int, Optional[int], int) -> None
+        if self._index_data is None:
+            raise TypeError("VertexArray object has no index buffer.")
+        if count is None:
+            count = self._index_data.count - first
+        dtype = self._index_data.dtype   # type: DTypeInfo
+        if self._dirty:
+            self.flush()
+        gl_state.bind_vertex_array(self.vao)
+        GL.glDrawElements(mode, count, dtype.gl_size, GL.GLvoidp(first * dtype.byte_size))
+
+    def capture(self, target, mode=GL.GL_POINTS, count=None, first=0):
+        # type: (VertexArray, int, Optional[int], int) -> None
+        # Runs the vertices through the program in use with rasterization off, and writes the outputs named
+        # by its varyings (see ShaderProgramData.link) to the start of target's buffer, in vertex order.
+        if count is None:
+            count = self._num_vertices - first
+        GL.glEnable(GL.GL_RASTERIZER_DISCARD)
+        GL.glBindBufferBase(GL.GL_TRANSFORM_FEEDBACK_BUFFER, 0, target.vbo)
+        GL.glBeginTransformFeedback(mode)
+        self.draw_arrays(mode, count, first)
+        GL.glEndTransformFeedback()
+        GL.glBindBufferBase(GL.GL_TRANSFORM_FEEDBACK_BUFFER, 0, 0)
+        GL.glDisable(GL.GL_RASTERIZER_DISCARD)
+
+    def multi_draw_arrays(self, mode, firsts, counts):
+        # type: (int, Union[array, Sequence[int]], Union[array, Sequence[int]]) -> None
+        # Draws len(firsts) vertex ranges with a single call.
+        if self._dirty:
+            self.flush()
+        gl_state.bind_vertex_array(self.vao)
+        _multi_draw_arrays(mode, firsts, counts)
+
+    def multi_draw_primitives(self, mode, names):
+        # type: (int, Sequence[str]) -> None
+        firsts = array('i')
+        counts = array('i')
+        for name in names:
+            if name not in self.ranges:
+                raise KeyError("'{}' primitive is not packed in this VertexArray.".format(name))
+            first, count = self.ranges[name]
+            firsts.append(first)
+            counts.append(count)
+        self.multi_draw_arrays(mode, firsts, counts)
+
+    def set_strips(self, ranges):
+        # type: (Sequence[tuple]) -> None
+        # Builds an element buffer joining the (first, count) vertex ranges with primitive restart
+        # indices, so that a set of strips or fans is drawn by draw_strips() in a single call.
+        if self._index_data is not None and not self._restart_index:
+            raise TypeError("VertexArray object already has an index buffer.")
+        dtype = _index_dtype(self._num_vertices + 1)   # type: DTypeInfo
+        restart = (1 << 8 * dtype.byte_size) - 1
+        indices = array(dtype.format)
+        for first, count in ranges:
+            if indices:
+                indices.append(restart)
+            indices.extend(range(first, first + count))
+        data = indices.tobytes()
+
+        self._own_vertex_array()
+        gl_state.bind_vertex_array(self.vao)
+        if self.ebo is None:
+            self.ebo = GL.glGenBuffers(1)
+            self._objects.elements = self._objects.handle(BUFFER, self.ebo)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, len(data), data, GL.GL_DYNAMIC_DRAW)
+        self._objects.elements.resize(len(data))
+        gl_state.bind_vertex_array(0)
+
+        self._index_data = IndexData(dtype, len(indices), data)
+        self._restart_index = restart
+
+    def draw_strips(self, mode):
+        # type: (int) -> None
+        if not self._restart_index:
+            raise TypeError("VertexArray object has no strips; call set_strips() first.")
+        gl_state.primitive_restart(self._restart_index)
+        self.draw_elements(mode)
+        gl_state.primitive_restart(0)
+
+    def draw_primitive(self, mode, name, count=None):
+        # type: (int, str, Optional[int]) -> None
+        if name in self.index_ranges:
+            first, total = self.index_ranges[name]
+            self.draw_elements(mode, total if count is None else count, first)
+        elif name in self.ranges:
+            first, total = self.ranges[name]
+            self.draw_arrays(mode, total if count is None else count, first)
+        else:
+            raise KeyError("'{}' primitive is not packed in this VertexArray.".format(name))
+
+    @contextmanager
+    def render(self, mode, count=None, with_shader=None, primitive=None):
+        # type: (int, Optional[int], Optional[ShaderProgram], Optional[str]) -> None
+        shader = with_shader if isinstance(with_shader, ShaderProgram) else self._program
+        shader.use()
+
+        yield self._program
+
+        if primitive is not None:
+            self.draw_primitive(mode, primitive, count)
+        elif self._index_data is not None:
+            self.draw_elements(mode, count)
+        else:
+            self.draw_arrays(mode, count)
+
+    @contextmanager
+    def render_instanced(self, mode, instances=None, count=None, with_shader=None, primitive=None):
+        # type: (int, Optional[int], Optional[int], Optional[ShaderProgram], Optional[str]) -> None
+        shader = with_shader if isinstance(with_shader, ShaderProgram) else self._program
+        shader.use()
+
+        yield self._program
+
+        if primitive is not None:
+            if primitive in self.index_ranges:
+                first, total = self.index_ranges[primitive]
+                self.draw_elements_instanced(mode, instances, total if count is None else count, first)
+            elif primitive in self.ranges:
+                first, total = self.ranges[primitive]
+                self.draw_arrays_instanced(mode, instances, total if count is None else count, first)
+            else:
+                raise KeyError("'{}' primitive is not packed in this VertexArray.".format(primitive))
+        elif self._index_data is not None:
+            self.draw_elements_instanced(mode, instances, count)
+        else:
+            self.draw_arrays_instanced(mode, instances, count)
+
+
+class StreamingVertexArray(object):
+
+    # The buffer is a ring of 'segments' equally sized regions. Writes are appended to the current
+    # segment; when it is full a fence is placed behind it and the next segment is entered, after waiting
+    # for the fence placed when that one was left. With mapping, writes go through unsynchronized
+    # glMapBufferRange calls (the fences make them safe). Without it, the buffer is orphaned whenever it
+    # fills up, and the driver hands over fresh storage instead of stalling.
+
+    MAP_FLAGS = GL.GL_MAP_WRITE_BIT | GL.GL_MAP_UNSYNCHRONIZED_BIT | GL.GL_MAP_INVALIDATE_RANGE_BIT
+
+    def __init__(self, arraydescriptor, shaderprogram, vert_capacity, segments=3, mapped=True):
+        # type: (VertexArrayData, ShaderProgram, int, int, bool) -> None
+        layout = arraydescriptor.layout   # type: VertexLayout
+        if layout.planar:
+            raise TypeError("StreamingVertexArray objects require an interleaved VertexArrayData layout.")
+        stride = layout.stride
+
+        vertex_array_object = GL.glGenVertexArrays(1)
+        gl_state.bind_vertex_array(vertex_array_object)
+
+        vertex_buffer = GL.glGenBuffers(1)
+        gl_state.bind_array_buffer(vertex_buffer)
+
+        _attribute_pointers(shaderprogram, layout, vert_capacity)
+
+        self._mapped = mapped and bool(GL.glMapBufferRange) and bool(GL.glFenceSync)
+        if not self._mapped:
+            segments = 1
+        self._segment_size = vert_capacity * stride
+        self._size = self._segment_size * segments
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, self._size, None, GL.GL_STREAM_DRAW)
+
+        gl_state.bind_vertex_array(0)
+
+        objects = _ArrayObjects(label='stream')
+        objects.vertex_array = objects.handle(VERTEX_ARRAY, vertex_array_object)
+        objects.buffer = objects.handle(BUFFER, vertex_buffer, self._size)
+        objects.capacity = self._size
+
+        self.vao = vertex_array_object
+        self.vbo = vertex_buffer
+        self._objects = objects
+        self._program = shaderprogram
+        self._stride = stride
+        self._fences = [None] * segments
+        self._segment = 0
+        self._cursor = 0
+
+    @property
+    def vert_capacity(self):
+        # type: () -> int
+        return self._segment_size // self._stride
+
+    def release(self):
+        # type: () -> None
+        if self._objects is None:
+            return
+        for fence in self._fences:
+            if fence is not None:
+                GL.glDeleteSync(fence)
+        self._fences = [None] * len(self._fences)
+        self._objects.release()
+        self._objects = None
+        self.vao = self.vbo = None
+
+    def _wait(self, segment):
+        # type: (int) -> None
+        fence = self._fences[segment]
+        if fence is not None:
+            while GL.glClientWaitSync(fence, GL.GL_SYNC_FLUSH_COMMANDS_BIT, 1000000) not in (
+                    GL.GL_ALREADY_SIGNALED, GL.GL_CONDITION_SATISFIED):
+                pass
+            GL.glDeleteSync(fence)
+            self._fences[segment] = None
+
+    def _advance(self):
+        # type: () -> None
+        if self._mapped:
+            self._fences[self._segment] = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+            self._segment = (self._segment + 1) % len(self._fences)
+            self._wait(self._segment)
+        else:
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, self._size, None, GL.GL_STREAM_DRAW)
+        self._cursor = self._segment * self._segment_size
+
+    def write(self, data):
+        # type: (Union[bytes, bytearray, memoryview]) -> int
+        size = len(data)
+        if size > self._segment_size:
+            raise ValueError("data does not fit in a StreamingVertexArray segment ({} bytes).".format(
+                self._segment_size))
+        if size % self._stride != 0:
+            raise ValueError("data size is not a multiple of the vertex stride ({}).".format(self._stride))
+
+        gl_state.bind_array_buffer(self.vbo)
+        if self._cursor + size > (self._segment + 1) * self._segment_size:
+            self._advance()
+        offset = self._cursor
+
+        pointer = None
+        if self._mapped:
+            pointer = GL.glMapBufferRange(GL.GL_ARRAY_BUFFER, offset, size, self.MAP_FLAGS)
+        if pointer:
+            ctypes.memmove(pointer, data if isinstance(data, bytes) else bytes(data), size)
+            # GL_FALSE when the data store got corrupted while mapped (e.g. on a screen mode change)
+            if not GL.glUnmapBuffer(GL.GL_ARRAY_BUFFER):
+                pointer = None
+        if not pointer:
+            # not mapped, or the mapping failed (a NULL pointer): uploaded with a copy instead
+            GL.glBufferSubData(GL.GL_ARRAY_BUFFER, offset, size, _gl_data(data))
+
+        self._cursor = offset + size
+        # the first vertex of the written data, to be drawn with draw_arrays(mode, first, count)
+        return offset // self._stride
+
+    def draw_arrays(self, mode, first, count):
+        # type: (int, int, int) -> None
+        gl_state.bind_vertex_array(self.vao)
+        GL.glDrawArrays(mode, first, count)
+
+    def multi_draw_arrays(self, mode, firsts, counts):
+        # type: (int, Union[array, Sequence[int]], Union[array, Sequence[int]]) -> None
+        gl_state.bind_vertex_array(self.vao)
+        _multi_draw_arrays(mode, firsts, counts)
 
     @contextmanager
-    def render(self, mode, count=None, with_shader=None):
-        # type: (int, Optional[int], Optional[ShaderProgram]) -> None
+    def render(self, mode, first, count, with_shader=None):
+        # type: (int, int, int, Optional[ShaderProgram]) -> None
         shader = with_shader if isinstance(with_shader, ShaderProgram) else self._program
         shader.use()
 
         yield self._program
 
-        self.draw_arrays(mode, count)
-        shader.unbind()
+        self.draw_arrays(mode, first, count)
@@ -0,0 +1,142 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import os
+from typing import Callable, Iterable, Optional, Sequence, Tuple
+from .datatypes import DType
+from .primitives import VertexArrayData, attribute
+
+__all__ = [
+    'bake',
+]
+
+
+def _bake_worker(signature, generator, args):
+    # type: (tuple, Callable, tuple) -> Tuple[Optional[str], int]
+    # Runs in a worker process: rebuilds the layout from its (picklable) signature, fills an arena with
+    # the generated vertices and hands the bytes back through a shared memory block.
+    planar, attributes = signature
+    arraydata = VertexArrayData()
+    with arraydata.definition():
+        for name, dtype_name in attributes:
+            attribute(name, DType.lookup(dtype_name))
+    arena = arraydata.new_arena('baked')
+    arena.extend(generator(*args))
+
+    size = arena.byte_size
+    if size == 0:
+        return None, 0
+    block = _untracked_block(size)
+    block.buf[:size] = arena.data
+    block_name = block.name
+    block.close()
+    return block_name, size
+
+
+def _untracked_block(size):
+    # type: (int) -> shared_memory.SharedMemory
+    # The block is owned (and unlinked) by the parent process once it has been copied, so it must not be
+    # tracked (and reported as leaked) on this side.
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError:
+        pass
+    # before Python 3.13 POSIX blocks are always tracked, by their name with a leading slash
+    block = shared_memory.SharedMemory(create=True, size=size)
+    if os.name == 'posix':
+        resource_tracker.unregister('/' + block.name, 'shared_memory')
+    return block
+
+
+def _release_block(block):
+    # type: (shared_memory.SharedMemory) -> None
+    block.close()
+    block.unlink()
+
+
+def _layout_signature(arraydata):
+    # type: (VertexArrayData) -> tuple
+    layout = arraydata.layout
+    return layout.planar, tuple((name, dtype.name) for name, dtype in zip(layout.names, layout.dtypes))
+
+
+def bake(arraydata, jobs, max_workers=None, executor=None):
+    # type: (VertexArrayData, Iterable[Tuple[str, Callable, Sequence]], Optional[int], Optional[Executor]) -> None
+    # Each job is a (primitive_name, generator, args) tuple, where 'generator(*args)' returns an iterable of
+    # vertex attribute dicts (as passed to vertex()). Jobs run in a process pool; the results of jobs with
+    # the same primitive name are concatenated in job order.
+    if arraydata.layout is None:
+        raise TypeError("VertexArrayData object atributes are not defined yet.")
+    signature = _layout_signature(arraydata)
+
+    pool = executor if executor is not None else ProcessPoolExecutor(max_workers)
+    try:
+        futures = [
+            (name, pool.submit(_bake_worker, signature, generator, tuple(args))) for name, generator, args in jobs
+        ]
+        results = []
+        try:
+            for name, future in futures:
+                results.append((name,) + future.result())
+        except BaseException:
+            for _, block_name, _ in results:
+                if block_name is not None:
+                    _release_block(shared_memory.SharedMemory(name=block_name))
+            raise
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+    # one buffer per primitive, sized from the reported block sizes, so that every block is copied once
+    sizes = {}
+    for name, _, size in results:
+        sizes[name] = sizes.get(name, 0) + size
+    buffers = {name: bytearray(size) for name, size in sizes.items()}
+    positions = dict.fromkeys(sizes, 0)
+    for name, block_name, size in results:
+        if block_name is None:
+            continue
+        block = shared_memory.SharedMemory(name=block_name)
+        try:
+            view = block.buf[:size]
+            position = positions[name]
+            buffers[name][position: position + size] = view
+            positions[name] = position + size
+            view.release()
+        finally:
+            _release_block(block)
+
+    for name, data in buffers.items():
+        if arraydata.planar:
+            arraydata.set_primitive(name, data)
+        else:
+            # already interleaved vertex records, kept without another copy
+            arraydata.attach_primitive(name, data)
@@ -0,0 +1,181 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import hashlib
+import json
+import mmap
+import os
+import os.path as path
+import struct
+from typing import Callable, Optional, Sequence
+from .datatypes import DType
+from .primitives import VertexArrayData, IndexData
+
+__all__ = [
+    'GeometryCache',
+]
+
+# File layout: magic, header size (uint32), JSON header, then the vertex and index blobs, each one
+# starting on an ALIGNMENT boundary. Blob offsets in the header are absolute file offsets.
+MAGIC = b'EGLGEOM1'
+ALIGNMENT = 16
+_HEADER_SIZE = struct.Struct('<I')
+
+
+def _align(offset):
+    # type: (int) -> int
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class GeometryCache(object):
+
+    def __init__(self, directory):
+        # type: (str) -> None
+        self._directory = directory
+        self._maps = {}
+
+    @staticmethod
+    def signature(arraydata):
+        # type: (VertexArrayData) -> list
+        layout = arraydata.layout
+        if layout is None:
+            raise TypeError("VertexArrayData object atributes are not defined yet.")
+        return [layout.planar, [[name, dtype.name] for name, dtype in zip(layout.names, layout.dtypes)]]
+
+    def key(self, arraydata, version):
+        # type: (VertexArrayData, str) -> str
+        # 'version' identifies the generator of the geometry and must change whenever its output does.
+        content = json.dumps([MAGIC.decode(), self.signature(arraydata), version])
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def filename(self, key):
+        # type: (str) -> str
+        return path.join(self._directory, key + '.geom')
+
+    def store(self, arraydata, version, names=None):
+        # type: (VertexArrayData, str, Optional[Sequence[str]]) -> str
+        if names is None:
+            names = arraydata.primitive_names
+        key = self.key(arraydata, version)
+
+        blobs = []
+        primitives = []
+        for name in names:
+            vertices = arraydata[name]
+            entry = {'name': name, 'vertices': len(blobs)}
+            blobs.append(vertices)
+            index_data = arraydata.index_data(name)   # type: Optional[IndexData]
+            if index_data is not None:
+                entry['index_dtype'] = index_data.dtype.name
+                entry['index_count'] = index_data.count
+                entry['indices'] = len(blobs)
+                blobs.append(index_data.data)
+            primitives.append(entry)
+
+        # Blob offsets depend on the header size, which depends on the offsets: grow until it settles.
+        header = b''
+        while True:
+            offset = _align(len(MAGIC) + _HEADER_SIZE.size + len(header))
+            spans = []
+            for blob in blobs:
+                spans.append([offset, len(blob)])
+                offset = _align(offset + len(blob))
+            content = {
+                'signature': self.signature(arraydata),
+                'version': version,
+                'primitives': primitives,
+                'blobs': spans,
+            }
+            encoded = json.dumps(content, separators=(',', ':')).encode('utf-8')
+            if len(encoded) <= len(header):
+                break
+            header = encoded + b' ' * 64
+
+        if not path.isdir(self._directory):
+            os.makedirs(self._directory)
+        filename = self.filename(key)
+        temporary = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(temporary, 'wb') as stream:
+            stream.write(MAGIC)
+            stream.write(_HEADER_SIZE.pack(len(header)))
+            stream.write(encoded.ljust(len(header)))
+            for blob, (offset, size) in zip(blobs, spans):
+                stream.seek(offset)
+                stream.write(blob)
+        # readers never see a partially written file
+        os.replace(temporary, filename)
+        return key
+
+    def load(self, arraydata, version):
+        # type: (VertexArrayData, str) -> bool
+        key = self.key(arraydata, version)
+        filename = self.filename(key)
+        if not path.isfile(filename):
+            return False
+
+        with open(filename, 'rb') as stream:
+            if path.getsize(filename) == 0:
+                return False
+            mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(mapped)
+        start = len(MAGIC) + _HEADER_SIZE.size
+        content = None
+        if bytes(view[:len(MAGIC)]) == MAGIC:
+            header_size, = _HEADER_SIZE.unpack_from(view, len(MAGIC))
+            content = json.loads(bytes(view[start: start + header_size]).decode('utf-8'))
+        if content is None or content['signature'] != self.signature(arraydata) or content['version'] != version:
+            view.release()
+            mapped.close()
+            return False
+
+        # every primitive is a read-only view over the mapped file: nothing is read until the data is used,
+        # and VertexArray uploads straight from the mapping (through an ndarray over it; see _gl_data).
+        spans = content['blobs']
+        for entry in content['primitives']:
+            offset, size = spans[entry['vertices']]
+            index_data = None
+            if 'indices' in entry:
+                index_offset, index_size = spans[entry['indices']]
+                index_data = IndexData(DType.lookup(entry['index_dtype']), entry['index_count'],
+                                       view[index_offset: index_offset + index_size])
+            arraydata.attach_primitive(entry['name'], view[offset: offset + size], index_data)
+
+        self._maps[key] = mapped
+        return True
+
+    def load_or_bake(self, arraydata, version, builder):
+        # type: (VertexArrayData, str, Callable[[VertexArrayData], None]) -> bool
+        # Returns True when the geometry came from the cache; otherwise 'builder(arraydata)' creates it
+        # and the result is stored for the next run.
+        if self.load(arraydata, version):
+            return True
+        builder(arraydata)
+        self.store(arraydata, version)
+        return False
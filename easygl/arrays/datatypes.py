@@ -30,20 +30,118 @@
 from collections import namedtuple as nt
 from ctypes import sizeof
 import OpenGL.GL as GL
+import struct
+from typing import Union, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 __all__ = [
     'DType',
     'DTypeInfo',
+    'pack_int_2_10_10_10_rev',
 ]
 
 
-class DTypeInfo(nt("DTypeInfo", "name size byte_size gl_size, gl_type uniform format")):
+def _unorm(value, maximum):
+    # type: (float, int) -> int
+    return min(max(int(round(value * maximum)), 0), maximum)
+
+
+def _snorm(value, maximum):
+    # type: (float, int) -> int
+    return min(max(int(round(value * maximum)), -maximum), maximum)
+
+
+def pack_int_2_10_10_10_rev(x, y, z, w):
+    # type: (float, float, float, float) -> int
+    return ((_snorm(x, 511) & 0x3ff) | (_snorm(y, 511) & 0x3ff) << 10 |
+            (_snorm(z, 511) & 0x3ff) << 20 | (_snorm(w, 1) & 0x3) << 30)
+
+
+# largest integer value of each normalized format code
+_NORM_MAX = {'b': 127, 'B': 255, 'h': 32767, 'H': 65535}
+
+# struct.Struct objects by (dtype, count), see DTypeInfo.packer
+_packers = {}
+_numpy_dtypes = {}
+
+
+class DTypeInfo(nt("DTypeInfo", "name size byte_size gl_size, gl_type uniform format normalized", defaults=(False,))):
+
+    # DType members are unique, so they compare and hash by identity: no field by field comparisons
+    # (or hashing of every field) when they're looked up in sets and dicts, or checked against DType.
+    __eq__ = object.__eq__
+    __ne__ = object.__ne__
+    __hash__ = object.__hash__
 
     def load(self, *args):
         self.uniform(*args)
 
+    def packer(self, count=1):
+        # type: (int) -> struct.Struct
+        # A struct.Struct for 'count' consecutive values of this dtype (standard sizes, no alignment),
+        # compiled on first use and cached.
+        key = self, count
+        packer = _packers.get(key)
+        if packer is None:
+            packer = _packers[key] = struct.Struct('=' + self.format * count)
+        return packer
+
+    @property
+    def components(self):
+        # type: () -> int
+        # number of values in the packed representation (a single one for the 2_10_10_10 formats)
+        packer = self.packer()
+        return len(packer.unpack(bytes(packer.size)))
+
+    @property
+    def numpy_dtype(self):
+        # type: () -> np.dtype
+        # The NumPy dtype of one value: a scalar, a vector of 'components' scalars, or for a matCxR, C columns
+        # of R scalars (column-major, as GL reads it). The 2_10_10_10 formats are a single packed integer.
+        dtype = _numpy_dtypes.get(self)
+        if dtype is None:
+            if np is None:
+                raise RuntimeError("NumPy is required to get NumPy dtypes.")
+            components = self.components
+            # sized from the GL type, which can be wider than the struct code (e.g. GLulong)
+            scalar = np.dtype('{}{}'.format(np.dtype(self.format[-1]).kind, self.byte_size // components))
+            if components == 1:
+                dtype = scalar
+            elif self.columns[0] > 1:
+                dtype = np.dtype((scalar, self.columns))
+            else:
+                dtype = np.dtype((scalar, (components,)))
+            _numpy_dtypes[self] = dtype
+        return dtype
 
-DType = nt(
+    @property
+    def columns(self):
+        # type: () -> tuple
+        # (attribute locations, values per location) taken by a vertex attribute of this dtype: a matCxR
+        # is passed as C column vectors of R values each, in consecutive locations.
+        _, _, shape = self.name.rpartition('_m')
+        if not _ or not shape.isdigit():
+            return 1, self.size
+        return int(shape[0]), int(shape[-1])
+
+    def quantize(self, values):
+        # type: (Union[float, Sequence[float]]) -> tuple
+        # Converts floats to the integer values stored by a normalized dtype.
+        if self.gl_size == GL.GL_INT_2_10_10_10_REV:
+            return pack_int_2_10_10_10_rev(*values),
+        if self.size == 1:
+            values = values,
+        maximum = _NORM_MAX[self.format[-1]]
+        if self.format[-1].islower():
+            return tuple(_snorm(value, maximum) for value in values)
+        return tuple(_unorm(value, maximum) for value in values)
+
+
+class _DTypes(nt(
     "DType",
     "bool byte short int ubyte ushort uint ulong "
     "bool_v2 byte_v2 short_v2 int_v2 ubyte_v2 ushort_v2 uint_v2 ulong_v2 "
@@ -59,7 +157,25 @@ DType = nt(
     "double_m2 double_m23 double_m24 "
     "double_m3 double_m32 double_m34 "
     "double_m4 double_m42 double_m43 "
-)(
+    "half half_v2 half_v3 half_v4 "
+    "nubyte nubyte_v2 nubyte_v3 nubyte_v4 "
+    "nushort nushort_v2 nushort_v3 nushort_v4 "
+    "int_2_10_10_10_rev "
+)):
+    __slots__ = ()
+
+    def __contains__(self, dtype):
+        # type: (DTypeInfo) -> bool
+        return dtype in _members
+
+    def lookup(self, name):
+        # type: (str) -> DTypeInfo
+        if name not in _by_name:
+            raise KeyError("'{}' is not a DType member name.".format(name))
+        return _by_name[name]
+
+
+DType = _DTypes(
     DTypeInfo('bool',   1, sizeof(GL.GLboolean), GL.GL_BOOL,           GL.GLboolean, GL.glUniform1ui, '?'),
     DTypeInfo('byte',   1, sizeof(GL.GLbyte),    GL.GL_BYTE,           GL.GLbyte,    GL.glUniform1i,  'b'),
     DTypeInfo('short',  1, sizeof(GL.GLshort),   GL.GL_SHORT,          GL.GLshort,   GL.glUniform1i,  'h'),
@@ -124,4 +240,28 @@ DType = nt(
     DTypeInfo('double_m4',  16, 16 * sizeof(GL.GLdouble), GL.GL_DOUBLE, GL.GLdouble, GL.glUniformMatrix4dv,   '16d'),
     DTypeInfo('double_m42',  8,  8 * sizeof(GL.GLdouble), GL.GL_DOUBLE, GL.GLdouble, GL.glUniformMatrix4x2dv, '8d'),
     DTypeInfo('double_m43', 12, 12 * sizeof(GL.GLdouble), GL.GL_DOUBLE, GL.GLdouble, GL.glUniformMatrix4x3dv, '12d'),
+
+    DTypeInfo('half',    1, 1 * sizeof(GL.GLhalfARB), GL.GL_HALF_FLOAT, GL.GLhalfARB, GL.glUniform1f, 'e'),
+    DTypeInfo('half_v2', 2, 2 * sizeof(GL.GLhalfARB), GL.GL_HALF_FLOAT, GL.GLhalfARB, GL.glUniform2f, 'ee'),
+    DTypeInfo('half_v3', 3, 3 * sizeof(GL.GLhalfARB), GL.GL_HALF_FLOAT, GL.GLhalfARB, GL.glUniform3f, 'eee'),
+    DTypeInfo('half_v4', 4, 4 * sizeof(GL.GLhalfARB), GL.GL_HALF_FLOAT, GL.GLhalfARB, GL.glUniform4f, 'eeee'),
+
+    DTypeInfo('nubyte',    1, 1 * sizeof(GL.GLubyte), GL.GL_UNSIGNED_BYTE, GL.GLubyte, GL.glUniform1f, 'B',    True),
+    DTypeInfo('nubyte_v2', 2, 2 * sizeof(GL.GLubyte), GL.GL_UNSIGNED_BYTE, GL.GLubyte, GL.glUniform2f, 'BB',   True),
+    DTypeInfo('nubyte_v3', 3, 3 * sizeof(GL.GLubyte), GL.GL_UNSIGNED_BYTE, GL.GLubyte, GL.glUniform3f, 'BBB',  True),
+    DTypeInfo('nubyte_v4', 4, 4 * sizeof(GL.GLubyte), GL.GL_UNSIGNED_BYTE, GL.GLubyte, GL.glUniform4f, 'BBBB', True),
+
+    DTypeInfo('nushort',    1, 1 * sizeof(GL.GLushort), GL.GL_UNSIGNED_SHORT, GL.GLushort, GL.glUniform1f, 'H',    True),
+    DTypeInfo('nushort_v2', 2, 2 * sizeof(GL.GLushort), GL.GL_UNSIGNED_SHORT, GL.GLushort, GL.glUniform2f, 'HH',   True),
+    DTypeInfo('nushort_v3', 3, 3 * sizeof(GL.GLushort), GL.GL_UNSIGNED_SHORT, GL.GLushort, GL.glUniform3f, 'HHH',  True),
+    DTypeInfo('nushort_v4', 4, 4 * sizeof(GL.GLushort), GL.GL_UNSIGNED_SHORT, GL.GLushort, GL.glUniform4f, 'HHHH', True),
+
+    DTypeInfo('int_2_10_10_10_rev', 4, sizeof(GL.GLuint), GL.GL_INT_2_10_10_10_REV, GL.GLuint, GL.glUniform4f, 'I', True),
 )
+
+_members = frozenset(DType)
+_by_name = {dtype.name: dtype for dtype in DType}
+# single values are packed all the time, compile them upfront
+for _dtype in DType:
+    _dtype.packer()
+del _dtype
@@ -27,20 +27,30 @@
 #
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-# import numpy as np
-
-
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple as nt
 from contextlib import contextmanager
-from typing import Optional
+from contextvars import ContextVar
+from operator import length_hint
+from typing import Optional, Callable, Iterable, Sequence, Union
 from .datatypes import *
+from array import array
 import struct
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 __all__ = [
+    'IndexData',
+    'PackedPrimitives',
+    'PrimitiveRange',
     'attribute',
     'vertex',
     'vertex_copy',
+    'VertexArena',
     'VertexArrayData',
+    'VertexLayout',
 ]
 
 
@@ -62,26 +72,7 @@ def vertex(**attrs):
     # type: (...) -> bool
     arraystate = VertexArrayData.state()
     if arraystate is not None:
-        data = arraystate.data    # type: bytearray
-        descriptor = arraystate.descriptor    # type: VertexArrayData
-        position = arraystate.vertex_index * descriptor.stride
-        if position >= len(data):
-            return True
-        offset = 0
-        if data is not None:
-            for attr in descriptor.names:   # type: str
-                dtype = descriptor.dtype(attr)   # type: DTypeInfo
-                if dtype.size > 1:
-                    values = attrs.get(attr, arraystate.lastvalues.get(attr, (0,) * dtype.size))
-                    arraystate.lastvalues[attr] = values
-                    struct.pack_into(dtype.format, data, position + offset, *values)
-                else:
-                    value = attrs.get(attr, arraystate.lastvalues.get(attr, 0))
-                    arraystate.lastvalues[attr] = value
-                    struct.pack_into(dtype.format, data, position + offset, value)
-                offset += dtype.byte_size
-            arraystate += 1
-            arraystate.vertex_count += 1
+        return arraystate.vertex(**attrs)
     return False
 
 
@@ -89,37 +80,305 @@ def vertex_copy(index):
     # type: (int) -> bool
     arraystate = VertexArrayData.state()
     if arraystate is not None:
-        data = arraystate.data  # type: bytearray
-        descriptor = arraystate.descriptor  # type: VertexArrayData
-        chunk_position = index * descriptor.stride
-        position = arraystate.vertex_index * descriptor.stride
-
-        if not (0 <= chunk_position < position):
-            raise ValueError("'index' argument must be smaller than current index.")
-
-        if data is not None:
-            chunk = data[chunk_position: chunk_position + descriptor.stride]
-            data[position: position + descriptor.stride] = chunk
-            arraystate += 1
-            arraystate.vertex_count += 1
+        return arraystate.vertex_copy(index)
     return False
 
 
-class VertexArrayData(object):
+def _make_writer(names, dtypes, packer):
+    # type: (tuple, tuple, struct.Struct) -> Callable
+    # Generates a function that resolves every attribute value (given or last used) and writes
+    # the whole interleaved vertex with a single pack_into call. Normalized attributes take floats
+    # and are quantized on the way.
+    lines = ['def write(data, position, attrs, last):']
+    args = []
+    namespace = {'pack_into': packer.pack_into}
+    for i, (name, dtype) in enumerate(zip(names, dtypes)):   # type: int, (str, DTypeInfo)
+        lines.append('    v{0} = last[{1!r}] = attrs.get({1!r}, last[{1!r}])'.format(i, name))
+        if dtype.normalized:
+            namespace['quantize{}'.format(i)] = dtype.quantize
+            lines.append('    q{0} = quantize{0}(v{0})'.format(i))
+            args.extend('q{}[{}]'.format(i, j) for j in range(dtype.components))
+        elif dtype.size > 1:
+            args.extend('v{}[{}]'.format(i, j) for j in range(dtype.size))
+        else:
+            args.append('v{}'.format(i))
+    lines.append('    pack_into(data, position, {})'.format(', '.join(args)))
+
+    exec('\n'.join(lines), namespace)
+    return namespace['write']
+
+
+def _quantize_array(dtype, column):
+    # type: (DTypeInfo, np.ndarray) -> np.ndarray
+    # vectorized version of DTypeInfo.quantize over a (count, size) array of floats
+    if dtype.components < dtype.size:
+        xyz = np.clip(np.rint(column[:, :3] * 511.), -511, 511).astype(np.int64) & 0x3ff
+        w = np.clip(np.rint(column[:, 3]), -1, 1).astype(np.int64) & 0x3
+        packed = xyz[:, 0] | xyz[:, 1] << 10 | xyz[:, 2] << 20 | w << 30
+        return packed.reshape(-1, 1)
+    scalar = np.dtype(dtype.format[-1])
+    maximum = np.iinfo(scalar).max
+    minimum = -maximum if np.iinfo(scalar).min < 0 else 0
+    return np.clip(np.rint(column * maximum), minimum, maximum)
+
+
+def _index_dtype(vert_count):
+    # type: (int) -> DTypeInfo
+    if vert_count <= 0x100:
+        return DType.ubyte
+    elif vert_count <= 0x10000:
+        return DType.ushort
+    return DType.uint
+
+
+IndexData = nt("IndexData", "dtype count data")
+
+PrimitiveRange = nt("PrimitiveRange", "first count")
+
+PackedPrimitives = nt("PackedPrimitives", "data ranges index_data index_ranges")
+
+
+class VertexLayout(nt("VertexLayout", "names dtypes offsets stride struct writer planar")):
+
+    @classmethod
+    def compile(cls, attributes, planar=False):
+        # type: (OrderedDict, bool) -> VertexLayout
+        names = tuple(attributes.keys())
+        dtypes = tuple(attributes[name] for name in names)
+        offsets = []
+        fmt = '='
+        stride = 0
+        for dtype in dtypes:   # type: DTypeInfo
+            offsets.append(stride)
+            # standard sizes and no alignment; pad where the GL type is wider than the struct code
+            fmt += dtype.format + 'x' * (dtype.byte_size - dtype.packer().size)
+            stride += dtype.byte_size
+        packer = struct.Struct(fmt)
+        return cls(names, dtypes, tuple(offsets), stride, packer, _make_writer(names, dtypes, packer), planar)
+
+    def defaults(self, **values):
+        # type: (...) -> dict
+        lastvalues = {
+            name: (0,) * dtype.size if dtype.size > 1 else 0 for name, dtype in zip(self.names, self.dtypes)
+        }
+        lastvalues.update(values)
+        return lastvalues
+
+    def dtype(self, name):
+        # type: (str) -> DTypeInfo
+        return self.dtypes[self.names.index(name)]
+
+    def offset(self, name):
+        # type: (str) -> int
+        return self.offsets[self.names.index(name)]
+
+    def attribute_offset(self, name, vert_count):
+        # type: (str, int) -> int
+        # In a planar layout every attribute is stored in its own region of 'vert_count' elements, and the
+        # regions follow the attribute order, so the region offset is the interleaved offset scaled by it.
+        if self.planar:
+            return self.offset(name) * vert_count
+        return self.offset(name)
+
+    def attribute_stride(self, name):
+        # type: (str) -> int
+        if self.planar:
+            return self.dtype(name).byte_size
+        return self.stride
+
+    @property
+    def numpy_dtype(self):
+        # type: () -> np.dtype
+        # structured dtype of one interleaved vertex record, padding included
+        if np is None:
+            raise RuntimeError("NumPy is required to get NumPy dtypes.")
+        return np.dtype({
+            'names': list(self.names),
+            'formats': [dtype.numpy_dtype for dtype in self.dtypes],
+            'offsets': list(self.offsets),
+            'itemsize': self.stride,
+        })
+
+    def view(self, buffer, name=None):
+        # type: (Union[bytes, bytearray, memoryview], Optional[str]) -> np.ndarray
+        # An ndarray over 'buffer', with no copy: one record per vertex (interleaved layouts only) or, given an
+        # attribute name, that attribute's values for every vertex. It's writable when the buffer is.
+        if np is None:
+            raise RuntimeError("NumPy is required to view vertex data as arrays.")
+        vert_count = len(buffer) // self.stride
+        if name is None:
+            if self.planar:
+                raise TypeError("record views require an interleaved VertexArrayData layout.")
+            return np.frombuffer(buffer, self.numpy_dtype, vert_count)
+        if name not in self.names:
+            raise ValueError("'{}' attribute is not defined.".format(name))
+        return np.ndarray((vert_count,), self.dtype(name).numpy_dtype, buffer,
+                          self.attribute_offset(name, vert_count), (self.attribute_stride(name),))
+
+    def attribute_locations(self, base=0):
+        # type: (int) -> dict
+        # consecutive locations in definition order, from 'base'; matrices take one per column
+        locations = {}
+        for name, dtype in zip(self.names, self.dtypes):   # type: str, DTypeInfo
+            locations[name] = base
+            base += dtype.columns[0]
+        return locations
+
+    def to_planar(self, data):
+        # type: (Union[bytes, bytearray]) -> bytes
+        stride = self.stride
+        vert_count = len(data) // stride
+        if np is not None:
+            records = np.frombuffer(data, np.uint8).reshape(vert_count, stride)
+            return b''.join(
+                records[:, offset: offset + dtype.byte_size].tobytes()
+                for dtype, offset in zip(self.dtypes, self.offsets)
+            )
+        view = memoryview(data)
+        chunks = []
+        for dtype, offset in zip(self.dtypes, self.offsets):   # type: DTypeInfo, int
+            chunks.extend(
+                view[position: position + dtype.byte_size]
+                for position in range(offset, vert_count * stride, stride)
+            )
+        return b''.join(chunks)
+
+    def to_interleaved(self, data):
+        # type: (Union[bytes, bytearray]) -> bytes
+        stride = self.stride
+        vert_count = len(data) // stride
+        interleaved = bytearray(len(data))
+        if np is not None:
+            records = np.frombuffer(interleaved, np.uint8).reshape(vert_count, stride)
+            for dtype, offset in zip(self.dtypes, self.offsets):   # type: DTypeInfo, int
+                region = np.frombuffer(data, np.uint8, vert_count * dtype.byte_size, vert_count * offset)
+                records[:, offset: offset + dtype.byte_size] = region.reshape(vert_count, dtype.byte_size)
+            return bytes(interleaved)
+        for dtype, offset in zip(self.dtypes, self.offsets):   # type: DTypeInfo, int
+            size = dtype.byte_size
+            region = vert_count * offset
+            for index in range(vert_count):
+                position = index * stride + offset
+                interleaved[position: position + size] = data[region + index * size: region + (index + 1) * size]
+        return bytes(interleaved)
+
+
+class VertexArena(object):
+    __slots__ = '_layout', '_data', '_vertex_count', 'lastvalues'
+
+    MIN_CAPACITY = 16
+
+    def __init__(self, layout, capacity=0, **defaults):
+        # type: (VertexLayout, int, ...) -> None
+        self._layout = layout
+        self._data = bytearray(layout.stride * capacity)
+        self._vertex_count = 0
+        self.lastvalues = layout.defaults(**defaults)
+
+    def __len__(self):
+        # type: () -> int
+        return self._vertex_count
+
+    @property
+    def layout(self):
+        # type: () -> VertexLayout
+        return self._layout
+
+    @property
+    def capacity(self):
+        # type: () -> int
+        return len(self._data) // self._layout.stride
+
+    @property
+    def byte_size(self):
+        # type: () -> int
+        return self._vertex_count * self._layout.stride
 
-    _defining = []
-    _arraystate = []
+    @property
+    def byte_capacity(self):
+        # type: () -> int
+        return len(self._data)
+
+    @property
+    def data(self):
+        # type: () -> memoryview
+        return memoryview(self._data)[:self.byte_size]
+
+    def _grow(self, vert_count):
+        # type: (int) -> None
+        capacity = max(self.capacity, self.MIN_CAPACITY)
+        while capacity < vert_count:
+            capacity *= 2
+        # a new buffer is allocated instead of resizing in place, so views handed out by `data` stay valid
+        data = bytearray(capacity * self._layout.stride)
+        data[:self.byte_size] = self.data
+        self._data = data
+
+    def reserve(self, vert_count):
+        # type: (int) -> None
+        if vert_count > self.capacity:
+            self._grow(vert_count)
+
+    def clear(self):
+        # type: () -> None
+        self._vertex_count = 0
+
+    def append(self, **attrs):
+        # type: (...) -> int
+        index = self._vertex_count
+        if (index + 1) * self._layout.stride > len(self._data):
+            self._grow(index + 1)
+        self._layout.writer(self._data, index * self._layout.stride, attrs, self.lastvalues)
+        self._vertex_count = index + 1
+        return index
+
+    def extend(self, vertices):
+        # type: (Iterable[dict]) -> int
+        first = self._vertex_count
+        hint = length_hint(vertices)
+        if hint > 0:
+            self.reserve(first + hint)
+
+        stride = self._layout.stride
+        writer = self._layout.writer
+        lastvalues = self.lastvalues
+        index = first
+        for attrs in vertices:
+            position = index * stride
+            if position + stride > len(self._data):
+                self._grow(index + 1)
+            writer(self._data, position, attrs, lastvalues)
+            index += 1
+            self._vertex_count = index
+        return index - first
+
+    def tobytes(self):
+        # type: () -> bytes
+        return bytes(self.data)
+
+
+# The definition and primitive stacks are context-local (and so thread-local), which lets several
+# threads build geometry at the same time. They hold tuples, replaced on every push and pop.
+_defining = ContextVar('easygl_vertex_defining', default=())
+_arraystate = ContextVar('easygl_vertex_arraystate', default=())
+
+
+class VertexArrayData(object):
 
     class ArrayState(object):
-        __slots__ = 'primitive_name', 'vertex_index', 'descriptor', 'lastvalues', 'vertex_count'
+        __slots__ = ('primitive_name', 'vertex_index', 'descriptor', 'layout', 'lastvalues', 'vertex_count',
+                     'growable', 'buffer')
 
-        def __init__(self, primitive_name, vertex_index, descriptor, defaults):
-            # type: (str, int, VertexArrayData, dict) -> None
+        def __init__(self, primitive_name, vertex_index, descriptor, defaults, growable=False, buffer=None):
+            # type: (str, int, VertexArrayData, dict, bool, Optional[bytearray]) -> None
             self.primitive_name = primitive_name
             self.vertex_index = vertex_index
             self.descriptor = descriptor
-            self.lastvalues = defaults
+            self.layout = descriptor.layout
+            self.lastvalues = self.layout.defaults(**defaults)
             self.vertex_count = 0
+            self.growable = growable
+            self.buffer = buffer
 
         def __eq__(self, other):
             if isinstance(other, VertexArrayData.ArrayState):
@@ -151,46 +410,110 @@ class VertexArrayData(object):
         @property
         def data(self):
             # type: () -> Optional[bytearray]
+            if self.buffer is not None:
+                return self.buffer
             try:
                 return self.descriptor[self.primitive_name]
             except (IndexError, KeyError):
                 return None
 
+        def grow(self, position):
+            # type: (int) -> bool
+            if not self.growable:
+                return False
+            data = self.data
+            data.extend(bytes(max(len(data), position + self.layout.stride, self.layout.stride * 16) - len(data)))
+            return True
+
+        def vertex(self, **attrs):
+            # type: (...) -> bool
+            data = self.data    # type: bytearray
+            layout = self.layout    # type: VertexLayout
+            position = self.vertex_index * layout.stride
+            if position >= len(data) and not self.grow(position):
+                return True
+            layout.writer(data, position, attrs, self.lastvalues)
+            self.vertex_index += 1
+            self.vertex_count += 1
+            return False
+
+        def vertex_copy(self, index):
+            # type: (int) -> bool
+            data = self.data  # type: bytearray
+            stride = self.layout.stride
+            chunk_position = index * stride
+            position = self.vertex_index * stride
+
+            if not (0 <= chunk_position < position):
+                raise ValueError("'index' argument must be smaller than current index.")
+
+            if data is not None:
+                if position >= len(data) and not self.grow(position):
+                    return True
+                data[position: position + stride] = data[chunk_position: chunk_position + stride]
+                self.vertex_index += 1
+                self.vertex_count += 1
+            return False
+
     @classmethod
     def get(cls):
         # type: () -> Optional[OrderedDict]
-        if len(cls._defining) > 0:
-            return cls._defining[-1]
+        defining = _defining.get()
+        if len(defining) > 0:
+            return defining[-1]
         return None
 
     @classmethod
     def state(cls):
         # type: () -> Optional[VertexArrayData.ArrayState]
-        if len(cls._arraystate) > 0:
-            return cls._arraystate[-1]
+        arraystate = _arraystate.get()
+        if len(arraystate) > 0:
+            return arraystate[-1]
         return None
 
-    def __init__(self):
-        # type: () -> None
+    def __init__(self, planar=False):
+        # type: (bool) -> None
         self._attributes = OrderedDict()
         self._defined = False
+        self._planar = planar
+        self._layout = None   # type: Optional[VertexLayout]
         self._data = {}
+        self._indices = {}
+        self._arenas = {}
 
     def __getitem__(self, key):
-        # type: (str) -> bytearray
+        # type: (str) -> Union[bytes, memoryview]
+        if key in self._arenas:
+            return self._arenas[key].data
         return self._data.__getitem__(key)
 
     def __delitem__(self, key):
         # type: (str) -> None
-        self._data.__delitem__(key)
+        if key in self._arenas:
+            del self._arenas[key]
+        else:
+            self._data.__delitem__(key)
+        self._indices.pop(key, None)
 
     @property
     def descriptor(self):
         # type: () -> OrderedDict
         return self._attributes.copy()
 
+    @property
+    def layout(self):
+        # type: () -> Optional[VertexLayout]
+        return self._layout
+
+    @property
+    def planar(self):
+        # type: () -> bool
+        return self._planar
+
     @property
     def names(self):
+        if self._layout is not None:
+            return self._layout.names
         return tuple(self._attributes.keys())
 
     def dtype(self, name):
@@ -202,48 +525,239 @@ class VertexArrayData(object):
         # type: () -> None
         if self._defined:
             raise TypeError("VertexArrayData object atributes are already defined.")
-        self.__class__._defining.append(self._attributes)
-
-        yield
+        token = _defining.set(_defining.get() + (self._attributes,))
+        try:
+            yield
+        finally:
+            _defining.reset(token)
 
-        self.__class__._defining.pop()
+        self._layout = VertexLayout.compile(self._attributes, self._planar)
         self._defined = True
 
     @contextmanager
-    def new_primitive(self, name, vert_count, **defaults):
+    def new_primitive(self, name, vert_count=None, **defaults):
+        # type: (str, Optional[int], ...) -> None
         if not self._defined:
             raise TypeError("VertexArrayData object atributes are not defined yet.")
-        byte_size = self.stride * vert_count
-        self._data[name] = bytearray(byte_size)
-        state = self.__class__.ArrayState(name, 0, self, defaults)
+        # without a vertex count the primitive grows as vertices are added
+        growable = vert_count is None
+        byte_size = self.stride * (vert_count or 0)
+        # the state owns the buffer while building, so builders in other threads never share it
+        state = self.__class__.ArrayState(name, 0, self, defaults, growable, bytearray(byte_size))
         # begin
-        self.__class__._arraystate.append(state)
-        yield
-        # end
-        self.__class__._arraystate.pop()
-        # NOTE: glBufferData won't accept bytearray, but it'll accept bytes as data (don't know why, though).
-        self._data[name] = bytes(self._data[name])
+        token = _arraystate.set(_arraystate.get() + (state,))
+        try:
+            yield state
+        finally:
+            # end
+            _arraystate.reset(token)
+        data = state.buffer
+        if growable:
+            del data[state.vertex_index * self.stride:]
+        if self._planar:
+            # vertices are always built interleaved and split into their attribute regions at the end
+            self._data[name] = self._layout.to_planar(data)
+        else:
+            self._data[name] = bytes(data)
+
+    def set_primitive(self, name, data):
+        # type: (str, Union[bytes, bytearray, memoryview]) -> None
+        # 'data' holds interleaved vertex records, as written by the vertex builders
+        if not self._defined:
+            raise TypeError("VertexArrayData object atributes are not defined yet.")
+        if len(data) % self.stride != 0:
+            raise ValueError("'data' size is not a multiple of the vertex stride ({}).".format(self.stride))
+        if self._planar:
+            self._data[name] = self._layout.to_planar(data)
+        else:
+            self._data[name] = bytes(data)
+        self._indices.pop(name, None)
+
+    def attach_primitive(self, name, buffer, index_data=None):
+        # type: (str, Union[bytes, memoryview], Optional[IndexData]) -> None
+        # Stores 'buffer' as is (no copy), so it must already be in this layout's format (planar or not).
+        if not self._defined:
+            raise TypeError("VertexArrayData object atributes are not defined yet.")
+        if len(buffer) % self.stride != 0:
+            raise ValueError("'buffer' size is not a multiple of the vertex stride ({}).".format(self.stride))
+        self._data[name] = buffer
+        if index_data is not None:
+            self._indices[name] = index_data
+        else:
+            self._indices.pop(name, None)
+
+    def new_arena(self, name, capacity=0, **defaults):
+        # type: (str, int, ...) -> VertexArena
+        if not self._defined:
+            raise TypeError("VertexArrayData object atributes are not defined yet.")
+        if self._planar:
+            raise TypeError("VertexArena objects require an interleaved VertexArrayData layout.")
+        arena = VertexArena(self._layout, capacity, **defaults)
+        self._arenas[name] = arena
+        return arena
+
+    def arena(self, name):
+        # type: (str) -> Optional[VertexArena]
+        return self._arenas.get(name)
+
+    def new_primitive_from_arrays(self, name, vert_count=None, **arrays):
+        # type: (str, Optional[int], ...) -> None
+        if not self._defined:
+            raise TypeError("VertexArrayData object atributes are not defined yet.")
+        if np is None:
+            raise RuntimeError("NumPy is required to build primitives from arrays.")
+
+        columns = {}
+        for attr in arrays:
+            if attr not in self._attributes:
+                raise ValueError("'{}' attribute is not defined.".format(attr))
+            dtype = self._attributes[attr]   # type: DTypeInfo
+            column = np.asarray(arrays[attr], dtype=np.float64 if dtype.normalized else dtype.format[-1])
+            # a single value (or a single vector) is broadcast to every vertex
+            if column.shape not in ((), (dtype.size,)) or (column.ndim == 1 and dtype.size == 1):
+                if column.size % dtype.size != 0:
+                    raise ValueError("'{}' array size is not a multiple of {}.".format(attr, dtype.size))
+                count = column.size // dtype.size
+                if vert_count is None:
+                    vert_count = count
+                elif count != vert_count:
+                    raise ValueError("'{}' array has {} vertices, expected {}.".format(attr, count, vert_count))
+                column = column.reshape(count, dtype.size)
+            if dtype.normalized:
+                column = _quantize_array(dtype, column.reshape(-1, dtype.size))
+            columns[attr] = column
+
+        if vert_count is None:
+            raise ValueError("'vert_count' argument is required when no per vertex array is given.")
+
+        layout = self._layout
+        data = bytearray(layout.stride * vert_count)
+        for attr, dtype in zip(layout.names, layout.dtypes):   # type: str, DTypeInfo
+            if attr in columns:
+                scalar = np.dtype(dtype.format[-1])
+                # strided view over this attribute's slot in every record (or over its planar region)
+                offset = layout.attribute_offset(attr, vert_count)
+                strides = layout.attribute_stride(attr), scalar.itemsize
+                target = np.ndarray((vert_count, dtype.components), scalar, data, offset, strides)
+                target[...] = columns[attr]
+
+        self._data[name] = bytes(data)
+
+    def view(self, name, attribute=None):
+        # type: (str, Optional[str]) -> np.ndarray
+        # A writable ndarray over a primitive (or arena) data, as given by VertexLayout.view. Primitives are
+        # stored as bytes, so the first view of one turns it into a bytearray; later ones copy nothing.
+        # VertexArray objects already made from the primitive keep the data they were made from.
+        if name in self._arenas:
+            buffer = self._arenas[name].data
+        else:
+            buffer = self._data[name]
+            if isinstance(buffer, bytes):
+                buffer = self._data[name] = bytearray(buffer)
+        return self._layout.view(buffer, attribute)
+
+    def index_primitive(self, name, indices=None, weld=False):
+        # type: (str, Optional[Sequence[int]], bool) -> IndexData
+        if name not in self._data:
+            raise KeyError("'{}' primitive not found.".format(name))
+        stride = self.stride
+        data = self._data[name]
+        vert_count = len(data) // stride
+
+        if indices is None:
+            indices = range(vert_count)
+        else:
+            for index in indices:
+                if not 0 <= index < vert_count:
+                    raise ValueError("index {} out of range for '{}' primitive.".format(index, name))
+
+        if weld:
+            if self._planar:
+                data = self._layout.to_interleaved(data)
+            elif not isinstance(data, bytes):
+                data = bytes(data)
+            # identical vertex records are merged into the first one seen
+            records = {}
+            remap = []
+            welded = bytearray()
+            for position in range(0, vert_count * stride, stride):
+                record = data[position: position + stride]
+                index = records.get(record)
+                if index is None:
+                    index = records[record] = len(records)
+                    welded += record
+                remap.append(index)
+            indices = [remap[index] for index in indices]
+            vert_count = len(records)
+            if self._planar:
+                self._data[name] = self._layout.to_planar(welded)
+            else:
+                self._data[name] = bytes(welded)
+
+        dtype = _index_dtype(vert_count)
+        index_data = IndexData(dtype, len(indices), array(dtype.format, indices).tobytes())
+        self._indices[name] = index_data
+        return index_data
+
+    def index_data(self, name):
+        # type: (str) -> Optional[IndexData]
+        return self._indices.get(name)
+
+    @property
+    def primitive_names(self):
+        # type: () -> tuple
+        return tuple(self._data.keys())
+
+    def pack(self, names=None):
+        # type: (Optional[Sequence[str]]) -> PackedPrimitives
+        if names is None:
+            names = self.primitive_names
+        stride = self.stride
+
+        chunks = []
+        ranges = OrderedDict()
+        first = 0
+        for name in names:
+            if name not in self._data:
+                raise KeyError("'{}' primitive not found.".format(name))
+            chunk = self._data[name]
+            count = len(chunk) // stride
+            ranges[name] = PrimitiveRange(first, count)
+            chunks.append(self._layout.to_interleaved(chunk) if self._planar else chunk)
+            first += count
+
+        # indices are rebased on the first vertex of their primitive and merged into a single list
+        index_data = None
+        index_ranges = OrderedDict()
+        indices = []
+        for name in names:
+            if name in self._indices:
+                source = self._indices[name]   # type: IndexData
+                base = ranges[name].first
+                index_ranges[name] = PrimitiveRange(len(indices), source.count)
+                source_indices = array(source.dtype.format)
+                source_indices.frombytes(source.data)
+                indices.extend(base + index for index in source_indices)
+        if len(index_ranges) > 0:
+            dtype = _index_dtype(first)
+            index_data = IndexData(dtype, len(indices), array(dtype.format, indices).tobytes())
+
+        data = b''.join(chunks)
+        if self._planar:
+            data = self._layout.to_planar(data)
+        return PackedPrimitives(data, ranges, index_data, index_ranges)
 
     @property
     def stride(self):
         # type: () -> int
-        stride = 0
-        if self._defined:
-            for name in self._attributes:
-                dtype = self._attributes[name]   # type: DTypeInfo
-                stride += dtype.byte_size
-
-        return stride
+        if self._layout is not None:
+            return self._layout.stride
+        return 0
 
     def offset(self, attr_name):
         # type: (str) -> int
-        offset = 0
-
-        if self._defined:
-            for name in self._attributes:
-                if name == attr_name:
-                    break
-                dtype = self._attributes[name]   # type: DTypeInfo
-                offset += dtype.byte_size
-
-        return offset
+        if self._layout is None:
+            return 0
+        if attr_name not in self._layout.names:
+            return self._layout.stride
+        return self._layout.offset(attr_name)
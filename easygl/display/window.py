@@ -35,6 +35,8 @@ from enum import Enum
 from typing import Union, Optional
 from contextlib import contextmanager
 from easygl.structures import Vec4, Vec2
+from easygl.glstate import gl_state
+from easygl.resources import collect
 from .events import *
 
 
@@ -99,6 +101,8 @@ class GLWindow(object):
             pg.display.gl_set_attribute(pg.GL_MULTISAMPLESAMPLES, samples)
 
         surface = pg.display.set_mode(size, flags)
+        # a new context starts from the default state
+        gl_state.invalidate()
         # print(surface)
         width, height = surface.get_size()
         pg.display.set_caption(title, title)
@@ -163,26 +167,26 @@ class GLWindow(object):
         if value is not self._blend_mode:
             self._blend_mode = value
             if value is BlendMode.none:
-                GL.glBlendFunc(GL.GL_ONE, GL.GL_ZERO)
+                gl_state.blend_func(GL.GL_ONE, GL.GL_ZERO)
 
             elif value is BlendMode.add:
                 try:
-                    GL.glBlendFuncSeparate(GL.GL_SRC_ALPHA, GL.GL_ONE, GL.GL_ONE, GL.GL_ONE)
+                    gl_state.blend_func(GL.GL_SRC_ALPHA, GL.GL_ONE, GL.GL_ONE, GL.GL_ONE)
                 except (NameError, Exception):
-                    GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE)
+                    gl_state.blend_func(GL.GL_SRC_ALPHA, GL.GL_ONE)
 
             elif value is BlendMode.alpha:
                 try:
-                    GL.glBlendFuncSeparate(
+                    gl_state.blend_func(
                         GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA, GL.GL_ONE, GL.GL_ONE_MINUS_SRC_ALPHA)
                 except (NameError, Exception):
-                    GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
+                    gl_state.blend_func(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
 
             elif value is BlendMode.multiply:
                 try:
-                    GL.glBlendFuncSeparate(GL.GL_ALPHA, GL.GL_ONE, GL.GL_ONE, GL.GL_ONE)
+                    gl_state.blend_func(GL.GL_ALPHA, GL.GL_ONE, GL.GL_ONE, GL.GL_ONE)
                 except (NameError, Exception):
-                    GL.glBlendFunc(GL.GL_DST_COLOR, GL.GL_ZERO)
+                    gl_state.blend_func(GL.GL_DST_COLOR, GL.GL_ZERO)
 
     @property
     def mouse_pos(self):
@@ -322,6 +326,8 @@ class GLWindow(object):
         yield delta
 
         pg.display.flip()
+        # delete the GL objects whose owners were collected since the last frame
+        collect()
         time = pg.time.get_ticks()
         self._delta = time - self._flip_time
         self._flip_time = time
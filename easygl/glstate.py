@@ -0,0 +1,155 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import OpenGL.GL as GL
+from typing import Optional
+
+__all__ = [
+    'GLState',
+    'gl_state',
+]
+
+
+class GLState(object):
+    __slots__ = '_program', '_vertex_array', '_array_buffer', '_active_unit', '_textures', '_blend', '_restart'
+
+    # Shadows the GL bindings easygl changes and skips the calls that would not change them. Every
+    # module binds through the 'gl_state' instance; GL calls made elsewhere must be followed by invalidate().
+
+    def __init__(self):
+        # type: () -> None
+        self.invalidate()
+
+    def invalidate(self):
+        # type: () -> None
+        # None means unknown: the next call for that binding always goes through
+        self._program = None
+        self._vertex_array = None
+        self._array_buffer = None
+        self._active_unit = None
+        self._textures = {}
+        self._blend = None
+        self._restart = None
+
+    @property
+    def program(self):
+        # type: () -> Optional[int]
+        return self._program
+
+    @property
+    def vertex_array(self):
+        # type: () -> Optional[int]
+        return self._vertex_array
+
+    def use_program(self, program):
+        # type: (int) -> None
+        if program != self._program:
+            GL.glUseProgram(program)
+            self._program = program
+
+    def bind_vertex_array(self, vertex_array):
+        # type: (int) -> None
+        if vertex_array != self._vertex_array:
+            GL.glBindVertexArray(vertex_array)
+            self._vertex_array = vertex_array
+
+    def bind_array_buffer(self, buffer):
+        # type: (int) -> None
+        if buffer != self._array_buffer:
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, buffer)
+            self._array_buffer = buffer
+
+    def active_texture(self, unit):
+        # type: (int) -> None
+        if unit != self._active_unit:
+            GL.glActiveTexture(GL.GL_TEXTURE0 + unit)
+            self._active_unit = unit
+
+    def bind_texture(self, texture, unit=None):
+        # type: (int, Optional[int]) -> None
+        # binds a GL_TEXTURE_2D to 'unit', or to the active unit if none is given
+        if unit is None:
+            if self._active_unit is None:
+                self.active_texture(0)
+            unit = self._active_unit
+        if self._textures.get(unit) != texture:
+            self.active_texture(unit)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+            self._textures[unit] = texture
+
+    def blend_func(self, src, dst, src_alpha=None, dst_alpha=None):
+        # type: (int, int, Optional[int], Optional[int]) -> None
+        if src_alpha is None:
+            blend = src, dst, src, dst
+        else:
+            blend = src, dst, src_alpha, dst_alpha
+        if blend != self._blend:
+            if src_alpha is None:
+                GL.glBlendFunc(src, dst)
+            else:
+                GL.glBlendFuncSeparate(src, dst, src_alpha, dst_alpha)
+            self._blend = blend
+
+    def primitive_restart(self, index):
+        # type: (int) -> None
+        # 0 disables primitive restart; any other value enables it with that restart index
+        if index != self._restart:
+            if index:
+                if not self._restart:
+                    GL.glEnable(GL.GL_PRIMITIVE_RESTART)
+                GL.glPrimitiveRestartIndex(index)
+            else:
+                GL.glDisable(GL.GL_PRIMITIVE_RESTART)
+            self._restart = index
+
+    def forget_texture(self, texture):
+        # type: (int) -> None
+        # deleting a texture unbinds it from every unit
+        for unit, bound in tuple(self._textures.items()):
+            if bound == texture:
+                self._textures[unit] = 0
+
+    def forget_buffer(self, buffer):
+        # type: (int) -> None
+        if self._array_buffer == buffer:
+            self._array_buffer = 0
+
+    def forget_vertex_array(self, vertex_array):
+        # type: (int) -> None
+        if self._vertex_array == vertex_array:
+            self._vertex_array = 0
+
+    def forget_program(self, program):
+        # type: (int) -> None
+        # its name may be reused by a new program, which must then be installed for real
+        if self._program == program:
+            self._program = None
+
+
+gl_state = GLState()
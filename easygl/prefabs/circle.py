@@ -372,11 +372,12 @@ def init():
     circle_shader_data.compile_vertex_shader('arc', shader_code=arc_vshader_code)
     circle_shader_data.compile_vertex_shader('pie', shader_code=pie_vshader_code)
 
-    circle_shader_data.link('circle_shader', vertex='circle', fragment='circle')
-    circle_shader_data.link('oval_shader', vertex='oval', fragment='circle')
-    circle_shader_data.link('circlefill_shader', vertex='circlefill', fragment='circle')
-    circle_shader_data.link('arc_shader', vertex='arc', fragment='circle')
-    circle_shader_data.link('pie_shader', vertex='pie', fragment='circle')
+    # linked against the same layout, all five programs draw through a single VAO
+    circle_shader_data.link('circle_shader', circle_vertex_data, vertex='circle', fragment='circle')
+    circle_shader_data.link('oval_shader', circle_vertex_data, vertex='oval', fragment='circle')
+    circle_shader_data.link('circlefill_shader', circle_vertex_data, vertex='circlefill', fragment='circle')
+    circle_shader_data.link('arc_shader', circle_vertex_data, vertex='arc', fragment='circle')
+    circle_shader_data.link('pie_shader', circle_vertex_data, vertex='pie', fragment='circle')
 
     circle_shader = circle_shader_data.build('circle_shader')
     oval_shader = circle_shader_data.build('oval_shader')
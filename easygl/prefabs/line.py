@@ -28,9 +28,10 @@
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 import pygame as pg
+from array import array
 from OpenGL.GL import GL_LINE_STRIP, GL_LINES, GL_LINE_LOOP
-from typing import Optional, Callable
-from easygl.arrays import VertexArrayData, DType, attribute, vertex, vertex_copy, VertexArray
+from typing import Optional, Callable, Sequence
+from easygl.arrays import VertexArrayData, DType, attribute, vertex, VertexArray, StreamingVertexArray
 from easygl.shaders import ShaderProgramData, ShaderProgram
 from easygl.textures import TexDescriptor, TextureData, MipMap, Wrap, Filter
 from easygl.structures import FrozenMat4, Vec2, Vec4, FrozenVec4
@@ -41,6 +42,7 @@ __all__ = [
     'init',
     'line',
     'lines',
+    'polylines',
     'lineset',
     'vline',
     'hline',
@@ -72,6 +74,10 @@ def lines(window, view, projection, points, closed, color_a, color_b=None, tex=N
     # type: (GLWindow, Mat4, Mat4, Union[list, tuple], bool, Union[Vec4, FrozenVec4], Union[Vec4, FrozenVec4], Optional[TexDescriptor], float, BlendMode, bool) -> None
     pass
 
+def polylines(window, view, projection, polylines, closed, color, tex=None, vcoord=0, blend=BlendMode.alpha):
+    # type: (GLWindow, Mat4, Mat4, Sequence[Union[list, tuple]], bool, Union[Vec4, FrozenVec4], Optional[TexDescriptor], float, BlendMode) -> None
+    pass
+
 def lineset(window, view, projection, points, color_a, color_b=None, tex=None, vcoord=0, blend=BlendMode.alpha, update=True, count=-1):
     # type: (GLWindow, Mat4, Mat4, Union[list, tuple], Union[Vec4, FrozenVec4], Union[Vec4, FrozenVec4], float, Optional[TexDescriptor], BlendMode, bool, int) -> None
     pass
@@ -101,7 +107,7 @@ def bake_lines(points, buffer=None):
 def init():
     # type: () -> None
     global _initialized, line, lines, vline, hline, bezier, bake_lines, lineset, line_vertex_data, line_shader_data,\
-           line_shader, line_batch
+           line_shader, line_batch, polylines
 
     if _initialized:
         return
@@ -113,6 +119,8 @@ def init():
     with line_vertex_data.definition():
         attribute('position', DType.float_v2)
 
+    # not drawn by the functions below (they stream their vertices), but there for VertexArray objects of
+    # one's own, e.g. to draw with line_batch()
     with line_vertex_data.new_primitive('line', 1024):
         v = 1. / 1024.
         for i in range(1024):
@@ -141,6 +149,7 @@ def init():
     uniform vec4 start_color;
     uniform vec4 end_color;
     uniform float point_count;
+    uniform float first_vertex;
     uniform float vcoord;
     
     out vec4 color;
@@ -148,9 +157,10 @@ def init():
     
     void main() {
     
+        float index = gl_VertexID - first_vertex;
         gl_Position = projection * view * vec4(position, 1.f, 1.f);
-        color = mix(start_color, end_color, gl_VertexID / (point_count - 1));
-        coord = vec2(mod(gl_VertexID, 2.f), vcoord);
+        color = mix(start_color, end_color, index / (point_count - 1));
+        coord = vec2(mod(index, 2.f), vcoord);
 
     }
     """
@@ -177,7 +187,7 @@ def init():
     line_shader_data.compile_vertex_shader('line', shader_code=line_vshader_code)
     line_shader_data.compile_fragment_shader('line', shader_code=line_fshader_code)
 
-    line_shader_data.link('line', vertex='line', fragment='line')
+    line_shader_data.link('line', line_vertex_data, vertex='line', fragment='line')
 
     line_shader = line_shader_data.build('line')
 
@@ -185,7 +195,9 @@ def init():
 
     # region - - -- ----==<[ VAOS ]>==---- -- - -
 
-    line_vertex_array = VertexArray(line_vertex_data, 'line', line_shader)
+    # each upload lands on a fresh range of the stream, so no draw stalls on the previous one
+    line_vertex_array = StreamingVertexArray(line_vertex_data, line_shader, 1024 * 16)
+    streamed_first = 0
 
     # endregion
 
@@ -193,6 +205,7 @@ def init():
 
     def bake_lines(points, buffer=None):
         # type: (Union[list, tuple], bytearray) -> None
+        nonlocal streamed_first
         verts = len(points)
         if verts > 1024:
             raise ValueError("Line is too long (more then 1024 vertices).")
@@ -203,7 +216,7 @@ def init():
             offset = i * stride
             Vec2.pack_values_into(x, y, buffer=data, offset=offset)
 
-        line_vertex_array.update_data(0, data)
+        streamed_first = line_vertex_array.write(data)
 
     # endregion
 
@@ -219,6 +232,7 @@ def init():
             shader.load4f('start_color', *color_a)
             shader.load4f('end_color', *color_b)
             shader.load1f('point_count', count)
+            shader.load1f('first_vertex', 0.)
             shader.load1f('vcoord', vcoord)
             if isinstance(tex, TexDescriptor):
                 shader.load_sampler2d('tex', tex.id, 0)
@@ -230,21 +244,23 @@ def init():
 
     def line(window, view, projection, point_a, point_b, color_a, color_b=None, tex=None, vcoord=0, blend=BlendMode.alpha, update=True):
         # type: (GLWindow, Mat4, Mat4, Vec2, Vec2, Union[Vec4, FrozenVec4], Union[Vec4, FrozenVec4], Optional[TexDescriptor], float, BlendMode, bool) -> None
+        nonlocal streamed_first
         current = window.blend_mode
         if update:
             data = Vec2(point_a).pack() + Vec2(point_b).pack()   # type: bytes
-            line_vertex_array.update_data(0, data)
+            streamed_first = line_vertex_array.write(data)
 
         if not isinstance(color_b , (Vec4, FrozenVec4)):
             color_b = color_a
 
         window.blend_mode = blend
-        with line_vertex_array.render(GL_LINES, 2) as shader:  # type: ShaderProgram
+        with line_vertex_array.render(GL_LINES, streamed_first, 2) as shader:  # type: ShaderProgram
             shader.load_matrix4f('view', 1, False, tuple(view))
             shader.load_matrix4f('projection', 1, False, tuple(projection))
             shader.load4f('start_color', *color_a)
             shader.load4f('end_color', *color_b)
             shader.load1f('point_count', 2.)
+            shader.load1f('first_vertex', streamed_first)
             shader.load1f('vcoord', vcoord)
             if isinstance(tex, TexDescriptor):
                 shader.load_sampler2d('tex', tex.id, 0)
@@ -256,6 +272,7 @@ def init():
 
     def lines(window, view, projection, points, closed, color_a, color_b=None, tex=None, vcoord=0, blend=BlendMode.alpha, update=True):
         # type: (GLWindow, Mat4, Mat4, Union[list, tuple], bool, Union[Vec4, FrozenVec4], Union[Vec4, FrozenVec4], Optional[TexDescriptor], float, BlendMode, bool) -> None
+        nonlocal streamed_first
         if len(points) < 2 and not closed:
             return
         if len(points) < 3 and closed:
@@ -271,19 +288,20 @@ def init():
             else:
                 for (x, y) in points[1:]:
                     data += Vec2.pack_values(x, y)
-            line_vertex_array.update_data(0, data)
+            streamed_first = line_vertex_array.write(data)
 
         if not isinstance(color_b , Vec4):
             color_b = color_a
 
         window.blend_mode = blend
         count = max(2, min(len(points), 1024))
-        with line_vertex_array.render(GL_LINE_STRIP if not closed else GL_LINE_LOOP, count) as shader:  # type: ShaderProgram
+        with line_vertex_array.render(GL_LINE_STRIP if not closed else GL_LINE_LOOP, streamed_first, count) as shader:  # type: ShaderProgram
             shader.load_matrix4f('view', 1, False, tuple(view))
             shader.load_matrix4f('projection', 1, False, tuple(projection))
             shader.load4f('start_color', *color_a)
             shader.load4f('end_color', *color_b)
             shader.load1f('point_count', count)
+            shader.load1f('first_vertex', streamed_first)
             shader.load1f('vcoord', vcoord)
             if isinstance(tex, TexDescriptor):
                 shader.load_sampler2d('tex', tex.id, 0)
@@ -293,8 +311,57 @@ def init():
                 shader.load1i('solidcolor', 1)
         window.blend_mode = current
 
+    def polylines(window, view, projection, polylines, closed, color, tex=None, vcoord=0, blend=BlendMode.alpha):
+        # type: (GLWindow, Mat4, Mat4, Sequence[Union[list, tuple]], bool, Union[Vec4, FrozenVec4], Optional[TexDescriptor], float, BlendMode) -> None
+        # All the polylines go to the stream at once and are drawn by a single glMultiDrawArrays call.
+        nonlocal streamed_first
+        data = bytearray()
+        firsts = array('i')
+        counts = array('i')
+        vertices = 0
+        flip = window.height if window.projection is Projection.ortho_down else None
+        for points in polylines:
+            if len(points) < (3 if closed else 2):
+                continue
+            # Every polyline starts on an even vertex of the batch (after an unused one if needed), so the
+            # texture coordinate parity (gl_VertexID - first_vertex) is the one it'd have if drawn alone.
+            if vertices % 2 == 1:
+                data += Vec2.pack_values(0., 0.)
+                vertices += 1
+            for (x, y) in points:
+                data += Vec2.pack_values(x, y) if flip is None else Vec2.pack_values(x, flip - y)
+            firsts.append(vertices)
+            counts.append(len(points))
+            vertices += len(points)
+        if not counts:
+            return
+
+        streamed_first = line_vertex_array.write(data)
+        for i in range(len(firsts)):
+            firsts[i] += streamed_first
+
+        current = window.blend_mode
+        window.blend_mode = blend
+        line_shader.use()
+        line_shader.load_matrix4f('view', 1, False, tuple(view))
+        line_shader.load_matrix4f('projection', 1, False, tuple(projection))
+        line_shader.load4f('start_color', *color)
+        line_shader.load4f('end_color', *color)
+        line_shader.load1f('point_count', 2.)
+        line_shader.load1f('first_vertex', streamed_first)
+        line_shader.load1f('vcoord', vcoord)
+        if isinstance(tex, TexDescriptor):
+            line_shader.load_sampler2d('tex', tex.id, 0)
+            line_shader.load1i('solidcolor', 0)
+        else:
+            line_shader.load_sampler2d('tex', texdata['line_tex'].id, 0)
+            line_shader.load1i('solidcolor', 1)
+        line_vertex_array.multi_draw_arrays(GL_LINE_STRIP if not closed else GL_LINE_LOOP, firsts, counts)
+        window.blend_mode = current
+
     def lineset(window, view, projection, points, color_a, color_b=None, tex=None, vcoord=0, blend=BlendMode.alpha, update=True, count=-1):
         # type: (GLWindow, Mat4, Mat4, Union[list, tuple], Union[Vec4, FrozenVec4], Union[Vec4, FrozenVec4], float, Optional[TexDescriptor], BlendMode, bool, int) -> None
+        nonlocal streamed_first
         if len(points) % 2 != 0 and update is True:
             return
 
@@ -308,7 +375,7 @@ def init():
             else:
                 for (x, y) in points[1:]:
                     data += Vec2.pack_values(x, y)
-            line_vertex_array.update_data(0, data)
+            streamed_first = line_vertex_array.write(data)
 
         if not isinstance(color_b , Vec4):
             color_b = color_a
@@ -316,12 +383,13 @@ def init():
         window.blend_mode = blend
         count = max(2, min(len(points), 1024)) if count == -1 else count
         count -= (count % 2) if count > 2 else 0
-        with line_vertex_array.render(GL_LINES, count) as shader:  # type: ShaderProgram
+        with line_vertex_array.render(GL_LINES, streamed_first, count) as shader:  # type: ShaderProgram
             shader.load_matrix4f('view', 1, False, tuple(view))
             shader.load_matrix4f('projection', 1, False, tuple(projection))
             shader.load4f('start_color', *color_a)
             shader.load4f('end_color', *color_b)
             shader.load1f('point_count', count)
+            shader.load1f('first_vertex', streamed_first)
             shader.load1f('vcoord', vcoord)
             if isinstance(tex, TexDescriptor):
                 shader.load_sampler2d('tex', tex.id, 0)
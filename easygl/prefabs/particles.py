@@ -0,0 +1,255 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import itertools
+import OpenGL.GL as GL
+from OpenGL.GL import GL_POINTS
+from typing import Optional, Union
+from easygl.arrays import VertexArrayData, DType, attribute, VertexArray
+from easygl.shaders import ShaderProgramData, ShaderProgram
+from easygl.structures import Vec2, Vec4, FrozenVec4
+from easygl.display import BlendMode, GLWindow
+
+
+__all__ = [
+    'init',
+    'ParticleSystem',
+    'particle_vertex_data',
+    'particle_draw_shader',
+    'particle_update_shader',
+    'particle_shader_data',
+]
+
+
+_initialized = False
+_names = itertools.count()
+particle_vertex_data = None
+particle_shader_data = None
+particle_update_shader = None
+particle_draw_shader = None
+
+
+def init():
+    # type: () -> None
+    global _initialized, particle_vertex_data, particle_shader_data, particle_update_shader, particle_draw_shader
+
+    if _initialized:
+        return
+
+    # region - - -- ----==<[ VERTEX DATA ]>==---- -- - -
+
+    particle_vertex_data = VertexArrayData()
+
+    with particle_vertex_data.definition():
+        attribute('position', DType.float_v2)
+        attribute('velocity', DType.float_v2)
+        # remaining and total lifetime, in seconds; particles with no time left are dead
+        attribute('life', DType.float_v2)
+
+    # endregion
+
+    # region - - -- ----==<[ SHADERS ]>==---- -- - -
+
+    update_vshader_code = """
+    #version 330 core
+
+    in vec2 position;
+    in vec2 velocity;
+    in vec2 life;
+
+    uniform float delta;
+    uniform vec2 gravity;
+    uniform float drag;
+
+    out vec2 next_position;
+    out vec2 next_velocity;
+    out vec2 next_life;
+
+    void main() {
+
+        if (life.x <= 0.f) {
+            next_position = position;
+            next_velocity = velocity;
+            next_life = vec2(0.f, life.y);
+            return;
+        }
+        vec2 speed = (velocity + gravity * delta) * max(0.f, 1.f - drag * delta);
+        next_position = position + speed * delta;
+        next_velocity = speed;
+        next_life = vec2(life.x - delta, life.y);
+    }
+    """
+    draw_vshader_code = """
+    #version 330 core
+
+    in vec2 position;
+    in vec2 life;
+
+    uniform mat4 view;
+    uniform mat4 projection;
+    uniform float point_size;
+
+    out float fade;
+
+    void main() {
+
+        fade = clamp(life.x / max(life.y, 1e-6f), 0.f, 1.f);
+        // dead particles are moved out of the clip volume
+        gl_Position = life.x > 0.f ? projection * view * vec4(position, 0.f, 1.f) : vec4(2.f, 2.f, 2.f, 1.f);
+        gl_PointSize = point_size;
+    }
+    """
+    draw_fshader_code = """
+    #version 330 core
+
+    in float fade;
+
+    uniform vec4 start_color;
+    uniform vec4 end_color;
+
+    out vec4 FragColor;
+
+    void main() {
+
+        vec2 coord = gl_PointCoord * 2.f - 1.f;
+        if (dot(coord, coord) > 1.f)
+            discard;
+        FragColor = mix(end_color, start_color, fade);
+    }
+    """
+
+    particle_shader_data = ShaderProgramData("")
+    particle_shader_data.compile_vertex_shader('particle_update', shader_code=update_vshader_code)
+    particle_shader_data.compile_vertex_shader('particle_draw', shader_code=draw_vshader_code)
+    particle_shader_data.compile_fragment_shader('particle_draw', shader_code=draw_fshader_code)
+
+    particle_shader_data.link('particle_update', particle_vertex_data,
+                              ('next_position', 'next_velocity', 'next_life'), vertex='particle_update')
+    particle_shader_data.link('particle_draw', particle_vertex_data, vertex='particle_draw',
+                              fragment='particle_draw')
+
+    particle_update_shader = particle_shader_data.build('particle_update')
+    particle_draw_shader = particle_shader_data.build('particle_draw')
+
+    GL.glEnable(GL.GL_PROGRAM_POINT_SIZE)
+
+    # endregion
+
+    _initialized = True
+
+
+class ParticleSystem(object):
+
+    # The particles live in two buffers: each update() reads one and writes the other through transform
+    # feedback, so they're simulated and drawn without ever coming back to the CPU. New particles take
+    # the slots after the last ones spawned (wrapping around), replacing the oldest ones.
+
+    def __init__(self, capacity):
+        # type: (int) -> None
+        if capacity <= 0:
+            raise ValueError("'capacity' argument must be greater than zero.")
+        init()
+        layout = particle_vertex_data.layout
+        self._arrays = []
+        for _ in range(2):
+            name = 'particles_{}'.format(next(_names))
+            particle_vertex_data.set_primitive(name, bytes(layout.stride * capacity))
+            self._arrays.append(VertexArray(particle_vertex_data, name, particle_update_shader))
+            # the VertexArray keeps the data it was made from
+            del particle_vertex_data[name]
+        self._capacity = capacity
+        self._cursor = 0
+        self._spawned = bytearray()
+        self._pack = layout.struct.pack
+
+    @property
+    def capacity(self):
+        # type: () -> int
+        return self._capacity
+
+    @property
+    def vertex_array(self):
+        # type: () -> VertexArray
+        # the buffer holding the current particles (the other one of the pair after every update())
+        return self._arrays[0]
+
+    def emit(self, position, velocity, life):
+        # type: (Union[Vec2, tuple], Union[Vec2, tuple], float) -> None
+        # The particle is uploaded (along with the others emitted since) by the next update().
+        x, y = position
+        vx, vy = velocity
+        self._spawned += self._pack(x, y, vx, vy, life, life)
+
+    def _upload(self):
+        # type: () -> None
+        stride = particle_vertex_data.layout.stride
+        data = self._spawned[-self._capacity * stride:]
+        self._spawned = bytearray()
+        source = self._arrays[0]   # type: VertexArray
+        count = len(data) // stride
+        head = min(count, self._capacity - self._cursor)
+        source.update_data(self._cursor * stride, bytes(data[:head * stride]))
+        if head < count:
+            source.update_data(0, bytes(data[head * stride:]))
+        self._cursor = (self._cursor + count) % self._capacity
+
+    def update(self, delta, gravity=(0., 0.), drag=0.):
+        # type: (float, Union[Vec2, tuple], float) -> None
+        # 'delta' is the time step, in seconds.
+        if self._spawned:
+            self._upload()
+        source, target = self._arrays   # type: VertexArray, VertexArray
+        particle_update_shader.use()
+        particle_update_shader.load1f('delta', delta)
+        particle_update_shader.load2f('gravity', *gravity)
+        particle_update_shader.load1f('drag', drag)
+        source.capture(target, GL_POINTS, self._capacity)
+        self._arrays.reverse()
+
+    def draw(self, window, view, projection, start_color, end_color=None, point_size=4., blend=BlendMode.alpha):
+        # type: (GLWindow, Mat4, Mat4, Union[Vec4, FrozenVec4], Optional[Union[Vec4, FrozenVec4]], float, BlendMode) -> None
+        # Particles fade from start_color to end_color over their lifetime.
+        if not isinstance(end_color, (Vec4, FrozenVec4)):
+            end_color = start_color
+        current = window.blend_mode
+        window.blend_mode = blend
+        particle_draw_shader.use()
+        particle_draw_shader.load_matrix4f('view', 1, False, tuple(view))
+        particle_draw_shader.load_matrix4f('projection', 1, False, tuple(projection))
+        particle_draw_shader.load4f('start_color', *start_color)
+        particle_draw_shader.load4f('end_color', *end_color)
+        particle_draw_shader.load1f('point_size', point_size)
+        self.vertex_array.draw_arrays(GL_POINTS, self._capacity)
+        window.blend_mode = current
+
+    def release(self):
+        # type: () -> None
+        for vertex_array in self._arrays:   # type: VertexArray
+            vertex_array.release()
+        self._arrays = []
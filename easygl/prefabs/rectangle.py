@@ -30,7 +30,7 @@
 import pygame as pg
 from OpenGL.GL import GL_LINE_STRIP, GL_TRIANGLES
 from typing import Optional, Callable
-from easygl.arrays import VertexArrayData, DType, attribute, vertex, vertex_copy, VertexArray
+from easygl.arrays import VertexArrayData, DType, attribute, vertex, VertexArray
 from easygl.shaders import ShaderProgramData, ShaderProgram
 from easygl.textures import TexDescriptor, TextureData, MipMap, Wrap, Filter
 from easygl.structures import FrozenMat4, Vec2, Vec4
@@ -92,15 +92,14 @@ def init():
         vertex(position=(1., 0.), ucoord=1.)  # bottom right
         vertex(position=(0., 0.), ucoord=0.)  # bottom left
         vertex(position=(0., 1.), ucoord=1.)  # top left
-        vertex_copy(0)
+    rectangle_vertex_data.index_primitive('quad_line', (0, 1, 2, 3, 0))
 
-    with rectangle_vertex_data.new_primitive('quad_fill', 6, ucoord=0.):
+    with rectangle_vertex_data.new_primitive('quad_fill', 4, ucoord=0.):
         vertex(position=(1., 1.))  # top right
         vertex(position=(1., 0.))  # bottom right
         vertex(position=(0., 1.))  # top left
-        vertex_copy(1)
         vertex(position=(0., 0.))  # bottom left
-        vertex_copy(2)
+    rectangle_vertex_data.index_primitive('quad_fill', (0, 1, 2, 1, 3, 2))
 
     # endregion
 
@@ -158,7 +157,7 @@ def init():
     rect_shader_data.compile_vertex_shader('rect', shader_code=rect_vshader_code)
     rect_shader_data.compile_fragment_shader('rect', shader_code=rect_fshader_code)
 
-    rect_shader_data.link('rect_shader', vertex='rect', fragment='rect')
+    rect_shader_data.link('rect_shader', rectangle_vertex_data, vertex='rect', fragment='rect')
 
     rect_shader = rect_shader_data.build('rect_shader')
 
@@ -166,8 +165,7 @@ def init():
 
     # region - - -- ----==<[ VAOS ]>==---- -- - -
 
-    rectline_vertex_array = VertexArray(rectangle_vertex_data, 'quad_line', rect_shader)
-    rectfill_vertex_array = VertexArray(rectangle_vertex_data, 'quad_fill', rect_shader)
+    rect_vertex_array = VertexArray(rectangle_vertex_data, ('quad_line', 'quad_fill'), rect_shader)
 
     # endregion
 
@@ -178,7 +176,7 @@ def init():
         model = FrozenMat4.transform(Vec4(position, 0., 1.), 0., Vec4(size, 0., 1.))
         current = window.blend_mode
         window.blend_mode = blend
-        with rectline_vertex_array.render(GL_LINE_STRIP) as shader:   # type: ShaderProgram
+        with rect_vertex_array.render(GL_LINE_STRIP, primitive='quad_line') as shader:   # type: ShaderProgram
             shader.load2f('origin', *origin)
             shader.load_matrix4f('model', 1, False, model)
             shader.load_matrix4f('view', 1, False, tuple(view))
@@ -199,7 +197,7 @@ def init():
         model = FrozenMat4.transform(Vec4(position, 0., 1.), angle, Vec4(size, 0., 1.))
         current = window.blend_mode
         window.blend_mode = blend
-        with rectline_vertex_array.render(GL_LINE_STRIP) as shader:   # type: ShaderProgram
+        with rect_vertex_array.render(GL_LINE_STRIP, primitive='quad_line') as shader:   # type: ShaderProgram
             shader.load2f('origin', *origin)
             shader.load_matrix4f('model', 1, False, model)
             shader.load_matrix4f('view', 1, False, tuple(view))
@@ -220,7 +218,7 @@ def init():
         model = FrozenMat4.transform(Vec4(position, 0., 1.), 0., Vec4(size, 0., 1.))
         current = window.blend_mode
         window.blend_mode = blend
-        with rectfill_vertex_array.render(GL_TRIANGLES) as shader:   # type: ShaderProgram
+        with rect_vertex_array.render(GL_TRIANGLES, primitive='quad_fill') as shader:   # type: ShaderProgram
             shader.load2f('origin', *origin)
             shader.load_matrix4f('model', 1, False, model)
             shader.load_matrix4f('view', 1, False, tuple(view))
@@ -237,7 +235,7 @@ def init():
         model = FrozenMat4.transform(Vec4(position, 0., 1.), angle, Vec4(size, 0., 1.))
         current = window.blend_mode
         window.blend_mode = blend
-        with rectfill_vertex_array.render(GL_TRIANGLES) as shader:  # type: ShaderProgram
+        with rect_vertex_array.render(GL_TRIANGLES, primitive='quad_fill') as shader:  # type: ShaderProgram
             shader.load2f('origin', *origin)
             shader.load_matrix4f('model', 1, False, model)
             shader.load_matrix4f('view', 1, False, tuple(view))
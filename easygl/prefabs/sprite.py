@@ -28,7 +28,7 @@
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 import math
-from easygl.arrays import VertexArrayData, attribute, vertex, vertex_copy, DType
+from easygl.arrays import VertexArrayData, attribute, vertex, DType
 from easygl.shaders import ShaderProgramData, ShaderProgram
 from easygl.arrays.arraybuffers import VertexArray
 from easygl.structures import Vec2, Vec3, Vec4, Mat4, FrozenMat4
@@ -40,6 +40,10 @@ from OpenGL.GL import GL_TRIANGLES
 __all__ = [
     'SpriteState',
     'AnimationState',
+    'SpriteVertexData',
+    'AnimatedVertexData',
+    'normalmap_vertexdata',
+    'SpriteShaderData',
     'sprite',
     'sprite_subimage',
     'sprite_nmap',
@@ -47,6 +51,10 @@ __all__ = [
 
 _initialized = False
 # SpriteState = None
+SpriteVertexData = None
+AnimatedVertexData = None
+normalmap_vertexdata = None
+SpriteShaderData = None
 
 
 def sprite(window, view, projection, texture, position, rotation, scale, origin, color, blend=BlendMode.alpha):
@@ -66,6 +74,7 @@ def sprite_nmap(window, view, projection, diffuse, normalmap, position, rotation
 
 def init():
     global SpriteState, AnimationState, _initialized, sprite, sprite_subimage, sprite_nmap
+    global SpriteVertexData, AnimatedVertexData, normalmap_vertexdata, SpriteShaderData
 
     if _initialized:
         return
@@ -78,26 +87,24 @@ def init():
         attribute('position', DType.float_v2)
         attribute('texcoord', DType.float_v2)
 
-    with SpriteVertexData.new_primitive('sprite', 6):
+    with SpriteVertexData.new_primitive('sprite', 4):
         vertex(position=(1., 1.), texcoord=(1., 1.))  # Top Right
         vertex(position=(1., 0.), texcoord=(1., 0.))  # Bottom Right
         vertex(position=(0., 1.), texcoord=(0., 1.))  # Top Left
-        vertex_copy(1)
         vertex(position=(0., 0.), texcoord=(0., 0.))  # Bottom Left
-        vertex_copy(2)
+    SpriteVertexData.index_primitive('sprite', (0, 1, 2, 1, 3, 2))
 
     AnimatedVertexData = VertexArrayData()
 
     with AnimatedVertexData.definition():
         attribute('position', DType.float_v2)
 
-    with AnimatedVertexData.new_primitive('anim_sprite', 6):
+    with AnimatedVertexData.new_primitive('anim_sprite', 4):
         vertex(position=(.5, .5))  # Top Right
         vertex(position=(.5, -.5))  # Bottom Right
         vertex(position=(-.5, .5))  # Top Left
-        vertex_copy(1)
         vertex(position=(-.5, -.5))  # Bottom Left
-        vertex_copy(2)
+    AnimatedVertexData.index_primitive('anim_sprite', (0, 1, 2, 1, 3, 2))
 
     normalmap_vertexdata = VertexArrayData()
 
@@ -106,13 +113,12 @@ def init():
         attribute('normal', DType.float_v3)
         attribute('texCoords', DType.float_v2)
 
-    with normalmap_vertexdata.new_primitive('nmap_sprite', 6):
+    with normalmap_vertexdata.new_primitive('nmap_sprite', 4):
         vertex(position=(1., 1.), normal=(0., 0., 1.), texCoords=(1., 1.))  # Top Right
         vertex(position=(1., 0.), normal=(0., 0., 1.), texCoords=(1., 0.))  # Bottom Right
         vertex(position=(0., 1.), normal=(0., 0., 1.), texCoords=(0., 1.))  # Top Left
-        vertex_copy(1)
         vertex(position=(0., 0.), normal=(0., 0., 1.), texCoords=(0., 0.))  # Bottom Left
-        vertex_copy(2)
+    normalmap_vertexdata.index_primitive('nmap_sprite', (0, 1, 2, 1, 3, 2))
 
     # endregion
 
@@ -176,15 +182,16 @@ def init():
     */
     out vec2 coord;
     
-    vec2 getCoord(vec4 ltrb, float index) {
+    vec2 getCoord(vec4 ltrb, int index) {
     //           T     Y
     // xyzw     L R   X Z
     // ltrb      B     W
+    // 'index' is the vertex index in the 'anim_sprite' primitive
     if (index == 0)                         // top right
         return ltrb.zy;
-    else if (index == 1 || index == 3)      // bottom right
+    else if (index == 1)                    // bottom right
         return ltrb.zw;
-    else if (index == 2 || index == 5)      // top left
+    else if (index == 2)                    // top left
         return ltrb.xy;
     else                                    // bottom left
         return ltrb.xw;
@@ -278,9 +285,9 @@ def init():
     SpriteShaderData.compile_vertex_shader('normalmap', shader_code=normalmap_vshader)
     SpriteShaderData.compile_fragment_shader('normalmap', shader_code=normalmap_fshader)
 
-    SpriteShaderData.link('sprite_shader', fragment='sprite', vertex='sprite')
-    SpriteShaderData.link('anim_sprite_shader', fragment='sprite', vertex='anim_sprite')
-    SpriteShaderData.link('normalmap_shader', fragment='normalmap', vertex='normalmap')
+    SpriteShaderData.link('sprite_shader', SpriteVertexData, fragment='sprite', vertex='sprite')
+    SpriteShaderData.link('anim_sprite_shader', AnimatedVertexData, fragment='sprite', vertex='anim_sprite')
+    SpriteShaderData.link('normalmap_shader', normalmap_vertexdata, fragment='normalmap', vertex='normalmap')
 
     sprite_program = SpriteShaderData.build('sprite_shader')
     anim_sprite_program = SpriteShaderData.build('anim_sprite_shader')
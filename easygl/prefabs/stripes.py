@@ -217,7 +217,7 @@ def init():
     line_shader_data.compile_vertex_shader('line', shader_code=line_vshader_code)
     line_shader_data.compile_fragment_shader('line', shader_code=line_fshader_code)
 
-    line_shader_data.link('line', vertex='line', fragment='line')
+    line_shader_data.link('line', stripe_array_data, vertex='line', fragment='line')
     line_shader = line_shader_data.build('line')
 
     # endregion
@@ -0,0 +1,338 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import weakref
+import warnings
+from collections import deque, defaultdict, namedtuple as nt
+import OpenGL.GL as GL
+from typing import Optional, Union, Hashable
+from .glstate import gl_state
+
+__all__ = [
+    'BUFFER',
+    'VERTEX_ARRAY',
+    'TEXTURE',
+    'SHADER',
+    'PROGRAM',
+    'GLHandle',
+    'GLObjectPool',
+    'GPUBudgetWarning',
+    'MemoryStats',
+    'buffer_pool',
+    'texture_pool',
+    'collect',
+    'live_objects',
+    'live_bytes',
+    'memory_stats',
+    'memory_report',
+    'reset_peaks',
+    'set_budget',
+]
+
+
+BUFFER = 'buffer'
+VERTEX_ARRAY = 'vertex_array'
+TEXTURE = 'texture'
+SHADER = 'shader'
+PROGRAM = 'program'
+
+
+def _delete_buffer(name):
+    GL.glDeleteBuffers(1, [name])
+    gl_state.forget_buffer(name)
+
+
+def _delete_vertex_array(name):
+    GL.glDeleteVertexArrays(1, [name])
+    gl_state.forget_vertex_array(name)
+
+
+def _delete_texture(name):
+    GL.glDeleteTextures(1, [name])
+    gl_state.forget_texture(name)
+
+
+def _delete_program(name):
+    GL.glDeleteProgram(name)
+    gl_state.forget_program(name)
+
+
+_deleters = {
+    BUFFER: _delete_buffer,
+    VERTEX_ARRAY: _delete_vertex_array,
+    TEXTURE: _delete_texture,
+    SHADER: GL.glDeleteShader,
+    PROGRAM: _delete_program,
+}
+
+class GPUBudgetWarning(RuntimeWarning):
+    pass
+
+
+class MemoryStats(nt("MemoryStats", "kind count bytes pooled_bytes peak_bytes labels")):
+
+    # 'bytes' is held by live objects and 'pooled_bytes' by released ones kept for reuse; 'peak_bytes' is
+    # the high-water mark of their sum. 'labels' breaks 'bytes' down by the labels given to the handles.
+
+    @property
+    def resident_bytes(self):
+        # type: () -> int
+        return self.bytes + self.pooled_bytes
+
+
+# {kind: {name: bytes}} for every GL object created through a GLHandle and not deleted yet
+_live = defaultdict(dict)
+_labels = defaultdict(dict)
+_totals = defaultdict(int)
+# high-water marks of the resident bytes, by kind (None for all kinds together)
+_peaks = defaultdict(int)
+_pools = defaultdict(list)
+# {kind (None for all kinds together): bytes}
+_budgets = {}
+_over_budget = set()
+
+
+def _resident(kind):
+    # type: (str) -> int
+    return _totals[kind] + sum(pool.byte_size for pool in _pools[kind])
+
+
+def _account(kind=None):
+    # type: (Optional[str]) -> None
+    # updates the high-water marks and warns, once per crossing, about exceeded budgets
+    usage = [(None, sum(_resident(other) for other in _deleters))]
+    if kind is not None:
+        usage.append((kind, _resident(kind)))
+    for key, used in usage:
+        if used > _peaks[key]:
+            _peaks[key] = used
+        limit = _budgets.get(key)
+        if limit is not None and used > limit:
+            if key not in _over_budget:
+                _over_budget.add(key)
+                warnings.warn("GPU memory budget exceeded{}: {} bytes in use, {} allowed.".format(
+                    " for {} objects".format(key) if key is not None else "", used, limit),
+                    GPUBudgetWarning, stacklevel=4)
+        else:
+            _over_budget.discard(key)
+
+
+def _set_size(kind, name, size):
+    # type: (str, int, int) -> None
+    _totals[kind] += size - _live[kind].get(name, 0)
+    _live[kind][name] = size
+    _account(kind)
+
+
+def set_budget(limit, kind=None):
+    # type: (Optional[int], Optional[str]) -> None
+    # a limit in bytes for the objects of 'kind' (or for all of them), None to remove it
+    if limit is None:
+        _budgets.pop(kind, None)
+        _over_budget.discard(kind)
+    else:
+        _budgets[kind] = limit
+        _account(kind)
+
+
+def reset_peaks():
+    # type: () -> None
+    _peaks.clear()
+    for kind in _deleters:
+        _peaks[kind] = _resident(kind)
+    _peaks[None] = sum(_peaks[kind] for kind in _deleters)
+
+
+def memory_stats(kind=None):
+    # type: (Optional[str]) -> Union[MemoryStats, dict]
+    if kind is None:
+        return {kind: memory_stats(kind) for kind in _deleters}
+    labels = defaultdict(int)
+    for name, size in _live[kind].items():
+        labels[_labels[kind].get(name)] += size
+    pooled = sum(pool.byte_size for pool in _pools[kind])
+    return MemoryStats(kind, len(_live[kind]), _totals[kind], pooled, _peaks[kind], dict(labels))
+
+
+def memory_report():
+    # type: () -> str
+    lines = ["{:<14}{:>8}{:>14}{:>14}{:>14}".format("kind", "count", "bytes", "pooled", "peak")]
+    for stats in memory_stats().values():   # type: MemoryStats
+        lines.append("{:<14}{:>8}{:>14}{:>14}{:>14}".format(
+            stats.kind, stats.count, stats.bytes, stats.pooled_bytes, stats.peak_bytes))
+        for label, size in sorted(stats.labels.items(), key=lambda item: -item[1]):
+            if label is not None and size > 0:
+                lines.append("  {:<34}{:>14}".format(label, size))
+    lines.append("{:<14}{:>8}{:>14}{:>14}{:>14}".format(
+        "total", sum(len(names) for names in _live.values()), sum(_totals.values()),
+        sum(pool.byte_size for pools in _pools.values() for pool in pools), _peaks[None]))
+    return "\n".join(lines)
+
+# Finalizers run wherever the garbage collector happens to run, which is not necessarily the thread
+# owning the GL context; they only queue the deletions, carried out by collect() on the GL thread.
+_pending = deque()
+
+
+def _dispose(kind, name, pool, pool_key):
+    # type: (str, int, Optional[GLObjectPool], Hashable) -> None
+    size = _live[kind].pop(name, 0)
+    _labels[kind].pop(name, None)
+    _totals[kind] -= size
+    if pool is None or not pool.give_back(pool_key, name, size):
+        _deleters[kind](name)
+    _account(kind)
+
+
+def collect():
+    # type: () -> int
+    # Deletes the GL objects whose owners were garbage collected; must be called from the GL thread.
+    count = 0
+    while _pending:
+        _dispose(*_pending.popleft())
+        count += 1
+    return count
+
+
+def live_objects(kind=None):
+    # type: (Optional[str]) -> Union[int, dict]
+    if kind is not None:
+        return len(_live[kind])
+    return {kind: len(names) for kind, names in _live.items()}
+
+
+def live_bytes(kind=None):
+    # type: (Optional[str]) -> Union[int, dict]
+    if kind is not None:
+        return _totals[kind]
+    return {kind: _totals[kind] for kind in _live}
+
+
+class GLHandle(object):
+    __slots__ = 'kind', 'name', '_finalizer'
+
+    # An owned GL object name. release() deletes it (or gives it back to its pool) at once; if the owner
+    # is garbage collected first, the same is queued for the next collect().
+
+    def __init__(self, owner, kind, name, size=0, pool=None, pool_key=None, label=None):
+        # type: (object, str, int, int, Optional[GLObjectPool], Hashable, Optional[str]) -> None
+        if kind not in _deleters:
+            raise ValueError("'{}' is not a GL object kind.".format(kind))
+        self.kind = kind
+        self.name = name
+        if label is not None:
+            _labels[kind][name] = label
+        _set_size(kind, name, size)
+        self._finalizer = weakref.finalize(owner, _pending.append, (kind, name, pool, pool_key))
+
+    @property
+    def alive(self):
+        # type: () -> bool
+        return self._finalizer.alive
+
+    @property
+    def size(self):
+        # type: () -> int
+        return _live[self.kind].get(self.name, 0)
+
+    def resize(self, size):
+        # type: (int) -> None
+        if self._finalizer.alive:
+            _set_size(self.kind, self.name, size)
+
+    def release(self):
+        # type: () -> None
+        args = self._finalizer.detach()
+        if args is not None:
+            _dispose(*args[2][0])
+
+
+class GLObjectPool(object):
+
+    # Keeps released GL objects by size class (any hashable key) so that they can be handed out again
+    # instead of being deleted and created anew. At most 'limit' free objects are kept per class.
+
+    def __init__(self, kind, limit=8):
+        # type: (str, int) -> None
+        self._kind = kind
+        self._limit = limit
+        self._free = defaultdict(list)
+        self._bytes = 0
+        _pools[kind].append(self)
+
+    def acquire(self, key):
+        # type: (Hashable) -> Optional[int]
+        # a free object of the 'key' class, or None if the caller must create one
+        free = self._free.get(key)
+        if free:
+            name, size = free.pop()
+            self._bytes -= size
+            return name
+        return None
+
+    def give_back(self, key, name, size=0):
+        # type: (Hashable, int, int) -> bool
+        if key is None or len(self._free[key]) >= self._limit:
+            return False
+        self._free[key].append((name, size))
+        self._bytes += size
+        return True
+
+    def free_count(self, key=None):
+        # type: (Optional[Hashable]) -> int
+        if key is not None:
+            return len(self._free.get(key, ()))
+        return sum(len(free) for free in self._free.values())
+
+    @property
+    def byte_size(self):
+        # type: () -> int
+        # memory held by the free objects
+        return self._bytes
+
+    def clear(self):
+        # type: () -> None
+        deleter = _deleters[self._kind]
+        for free in self._free.values():
+            for name, _ in free:
+                deleter(name)
+        self._free.clear()
+        self._bytes = 0
+
+    @staticmethod
+    def size_class(size, minimum=256):
+        # type: (int, int) -> int
+        # the power of two holding 'size' bytes
+        capacity = minimum
+        while capacity < size:
+            capacity <<= 1
+        return capacity
+
+
+buffer_pool = GLObjectPool(BUFFER)
+texture_pool = GLObjectPool(TEXTURE)
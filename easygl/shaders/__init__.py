@@ -28,4 +28,5 @@
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 from .programs import *
-from .builder import *
\ No newline at end of file
+from .cache import *
+from .builder import *
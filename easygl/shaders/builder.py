@@ -28,8 +28,18 @@
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 import OpenGL.GL as GL
+from OpenGL.GL.KHR.parallel_shader_compile import glInitParallelShaderCompileKHR, glMaxShaderCompilerThreadsKHR, \
+    GL_COMPLETION_STATUS_KHR
 import os.path as path
+from collections import namedtuple as nt
+import ctypes
+import hashlib
+import weakref
 from .programs import *
+from .cache import ProgramCache
+from ..arrays import VertexArrayData, VertexLayout
+from ..resources import GLHandle, SHADER, PROGRAM
+from typing import Union, Sequence, Optional, Tuple
 
 
 __all__ = [
@@ -42,29 +52,137 @@ class ShaderCompileError(Exception):
     pass
 
 
+# the state of a shader or program whose compile or link status isn't checked yet; 'attached' (the shaders)
+# and the cache 'key' are only set for programs
+_Pending = nt("_Pending", "signature attached key")
+
+
+class _SharedObject(object):
+    __slots__ = 'handle', 'users', 'state', '__weakref__'
+
+    # A shader (or program) shared by every ShaderProgramData that compiled the same source (or linked the
+    # same shaders the same way); deleted when the last of them releases it, or once nothing references it.
+
+    def __init__(self, kind, name, state=None):
+        # type: (str, int, Optional[_Pending]) -> None
+        self.handle = GLHandle(self, kind, name)
+        self.users = 0
+        # a _Pending until the compile or link status is checked, then None, or the (exception type, message)
+        # to raise if it failed, for every user
+        self.state = state
+
+    @property
+    def name(self):
+        # type: () -> int
+        return self.handle.name
+
+    def release(self):
+        # type: () -> None
+        self.users -= 1
+        if self.users == 0:
+            self.handle.release()
+
+
+# process wide, by shader type and normalized source hash, and by link signature. Uniform values live in
+# the program, so the users of a shared program should load the ones they rely on before drawing.
+_shared_shaders = weakref.WeakValueDictionary()
+_shared_programs = weakref.WeakValueDictionary()
+
+
+_parallel = None
+
+
+def _parallel_compile():
+    # type: () -> bool
+    # Enables GL_KHR_parallel_shader_compile (with as many compiler threads as the driver likes) if available.
+    global _parallel
+    if _parallel is None:
+        _parallel = bool(glInitParallelShaderCompileKHR())
+        if _parallel:
+            glMaxShaderCompilerThreadsKHR(0xFFFFFFFF)
+    return _parallel
+
+
+def _source_key(shader_type, code):
+    # type: (int, str) -> tuple
+    # indentation, trailing spaces and blank lines don't make shaders different
+    normalized = '\n'.join(line.strip() for line in code.splitlines() if line.strip())
+    return shader_type, hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
 class ShaderProgramData(object):
 
-    def __init__(self, shader_base_dir):
-        # type: (str) -> None
+    # used by the objects made without a cache of their own (e.g. those of the prefabs)
+    default_cache = None    # type: Optional[ProgramCache]
+
+    def __init__(self, shader_base_dir, cache=None, deferred=False):
+        # type: (str, Optional[ProgramCache], bool) -> None
+        # With a ProgramCache, shaders are only compiled when a program using them isn't found in the cache
+        # (so compile errors are raised by link). Deferred, compile and link statuses aren't checked until
+        # the program is built (errors are raised by build), which lets the driver compile them all at once.
         self._base_dir = shader_base_dir
+        self._cache = cache if cache is not None else self.default_cache
+        self._deferred = deferred
+        if deferred:
+            _parallel_compile()
+        self._sources = {}
         self._fragshaders = {}
-        self._frag_uniforms = {}
         self._vertshaders = {}
-        self._vert_uniforms = {}
         self._geomshaders = {}
-        self._geom_uniforms = {}
         self._shaderprograms = {}
-        self._uniforms = {}
-
-    def _extract_uniforms(self, lines):
-        uniforms = []
-        for line in lines:   # type: str
-            s = line.lstrip(' ')
-            if s.startswith('uniform'):
-                uniform = s.split()[-1].rstrip(';')
-                if uniform not in uniforms:
-                    uniforms.append(uniform)
-        return tuple(uniforms)
+        self._locations = {}
+        self._handles = {}
+
+    def _compile(self, shader_type, shaders, shader_name, code):
+        # type: (int, dict, str, str) -> None
+        if self._cache is None:
+            self._compile_source(shader_type, shaders, shader_name, code)
+        elif shader_name in shaders:
+            # compiled again from the new code, when needed
+            del shaders[shader_name]
+            self._handles.pop((shader_type, shader_name)).release()
+        self._sources[shader_type, shader_name] = code
+
+    def _compile_source(self, shader_type, shaders, shader_name, code):
+        # type: (int, dict, str, str) -> int
+        key = _source_key(shader_type, code)
+        shared = _shared_shaders.get(key)   # type: Optional[_SharedObject]
+        if shared is None:
+            shader_id = GL.glCreateShader(shader_type)
+            GL.glShaderSource(shader_id, code)
+            GL.glCompileShader(shader_id)
+            shared = _shared_shaders[key] = _SharedObject(SHADER, shader_id, _Pending(key, None, None))
+        # checked whether it was just compiled or shared (possibly compiled deferred, and never checked)
+        if not self._deferred:
+            self._check_shader(shared)
+        self._replace_shader(shader_type, shaders, shader_name, shared)
+        return shared.name
+
+    @staticmethod
+    def _check_shader(shared):
+        # type: (_SharedObject) -> None
+        if isinstance(shared.state, _Pending):
+            key = shared.state.signature
+            shared.state = None
+            if not GL.glGetShaderiv(shared.name, GL.GL_COMPILE_STATUS):
+                shared.state = ShaderCompileError, GL.glGetShaderInfoLog(shared.name)
+                # compiling the same source again will try again
+                if _shared_shaders.get(key) is shared:
+                    del _shared_shaders[key]
+        if shared.state is not None:
+            error, message = shared.state
+            if shared.users == 0:
+                shared.handle.release()
+            raise error(message)
+
+    def _replace_shader(self, shader_type, shaders, shader_name, shared):
+        # type: (int, dict, str, _SharedObject) -> None
+        # taken before the previous one is released, which may be the same object
+        shared.users += 1
+        if shader_name in shaders:
+            self._handles.pop((shader_type, shader_name)).release()
+        shaders[shader_name] = shared.name
+        self._handles[shader_type, shader_name] = shared
 
     def compile_fragment_shaders(self, **kwargs):
         # type: (...) -> None
@@ -89,16 +207,7 @@ class ShaderProgramData(object):
         else:
             raise ValueError("'shader_file' or 'shader_code' keyword argument expected.")
 
-        self._frag_uniforms[frag_shader_name] = self._extract_uniforms(fragment_code.split('\n'))
-
-        fragment_id = GL.glCreateShader(GL.GL_FRAGMENT_SHADER)
-        GL.glShaderSource(fragment_id, fragment_code)
-        GL.glCompileShader(fragment_id)
-
-        if not GL.glGetShaderiv(fragment_id, GL.GL_COMPILE_STATUS):
-            raise ShaderCompileError(GL.glGetShaderInfoLog(fragment_id))
-
-        self._fragshaders[frag_shader_name] = fragment_id
+        self._compile(GL.GL_FRAGMENT_SHADER, self._fragshaders, frag_shader_name, fragment_code)
 
     def compile_vertex_shaders(self, **kwargs):
         # type: (...) -> None
@@ -122,16 +231,7 @@ class ShaderProgramData(object):
         else:
             raise ValueError("'shader_file' or 'shader_code' keyword argument expected.")
 
-        self._vert_uniforms[vert_shader_name] = self._extract_uniforms(vertex_code.split('\n'))
-
-        vertex_id = GL.glCreateShader(GL.GL_VERTEX_SHADER)
-        GL.glShaderSource(vertex_id, vertex_code)
-        GL.glCompileShader(vertex_id)
-
-        if not GL.glGetShaderiv(vertex_id, GL.GL_COMPILE_STATUS):
-            raise ShaderCompileError(GL.glGetShaderInfoLog(vertex_id))
-
-        self._vertshaders[vert_shader_name] = vertex_id
+        self._compile(GL.GL_VERTEX_SHADER, self._vertshaders, vert_shader_name, vertex_code)
 
     def compile_geometry_shaders(self, **kwargs):
         # type: (...) -> None
@@ -155,55 +255,185 @@ class ShaderProgramData(object):
         else:
             raise ValueError("'shader_file' or 'shader_code' keyword argument expected.")
 
-        self._geom_uniforms[geom_shader_name] = self._extract_uniforms(geometry_code.split('\n'))
-
-        geometry_id = GL.glCreateShader(GL.GL_VERTEX_SHADER)
-        GL.glShaderSource(geometry_id, geometry_code)
-        GL.glCompileShader(geometry_id)
-
-        if not GL.glGetShaderiv(geometry_id, GL.GL_COMPILE_STATUS):
-            raise ShaderCompileError(GL.glGetShaderInfoLog(geometry_id))
-
-        self._geomshaders[geom_shader_name] = geometry_id
-
-    def link(self, program_name, **shaders):
-        # type: (...) -> None
-        vertex_id = self._vertshaders.get(shaders.get('vertex'))
-        fragment_id = self._fragshaders.get(shaders.get('fragment'))
-        geometry_id = self._geomshaders.get(shaders.get('geometry'))
-
+        self._compile(GL.GL_GEOMETRY_SHADER, self._geomshaders, geom_shader_name, geometry_code)
+
+    def link(self, program_name, layout=None, varyings=None, **shaders):
+        # type: (str, Union[VertexLayout, VertexArrayData, Sequence, None], Optional[Sequence[str]], ...) -> None
+        # With a layout (or a sequence of them, e.g. vertex then instance data), attribute locations are
+        # bound from it, so every program linked against that layout can draw with the same VAOs.
+        # With varyings, those outputs are captured interleaved by transform feedback (see VertexArray.capture).
+        stages = (
+            (GL.GL_VERTEX_SHADER, self._vertshaders, shaders.get('vertex')),
+            (GL.GL_GEOMETRY_SHADER, self._geomshaders, shaders.get('geometry')),
+            (GL.GL_FRAGMENT_SHADER, self._fragshaders, shaders.get('fragment')),
+        )
+
+        locations = None
+        if layout is not None:
+            if isinstance(layout, (VertexLayout, VertexArrayData)):
+                layout = layout,
+            locations = {}
+            base = 0
+            for item in layout:
+                item = item.layout if isinstance(item, VertexArrayData) else item   # type: VertexLayout
+                locations.update(item.attribute_locations(base))
+                base += sum(dtype.columns[0] for dtype in item.dtypes)
+
+        sources = [(shader_type, self._sources[shader_type, name]) for shader_type, _, name in stages
+                   if (shader_type, name) in self._sources]
+        # the same shaders linked the same way give the same program, whoever links them
+        signature = (tuple(_source_key(shader_type, code) for shader_type, code in sources),
+                     tuple(sorted(locations.items())) if locations is not None else None, tuple(varyings or ()))
+        shared = _shared_programs.get(signature)   # type: Optional[_SharedObject]
+        if shared is not None:
+            self._add_program(program_name, shared, locations)
+            if not self._deferred:
+                self._check(program_name)
+            return
+
+        key = None
+        loaded = False
         program = GL.glCreateProgram()
-
-        if vertex_id is not None:
-            GL.glAttachShader(program, vertex_id)
-        if geometry_id is not None:
-            GL.glAttachShader(program, geometry_id)
-        if fragment_id is not None:
-            GL.glAttachShader(program, fragment_id)
+        # owned by nothing until its _SharedObject is made, so it's deleted here if anything fails before
+        try:
+            if self._cache is not None:
+                key = self._cache.key(sources, locations, varyings)
+                loaded = self._cache.load(key, program)
+                if not loaded:
+                    # a rejected binary leaves the program unusable, start over with a new one
+                    rejected, program = program, GL.glCreateProgram()
+                    GL.glDeleteProgram(rejected)
+                    GL.glProgramParameteri(program, GL.GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL.GL_TRUE)
+            if not loaded:
+                attached = self._link_stages(program, stages, locations, varyings)
+        except BaseException:
+            GL.glDeleteProgram(program)
+            raise
+
+        if loaded:
+            shared = _shared_programs[signature] = _SharedObject(PROGRAM, program)
+            self._add_program(program_name, shared, locations)
+            return
+
+        shared = _SharedObject(PROGRAM, program, _Pending(signature, attached, key))
+        if not self._deferred:
+            self._wait(shared)
+            if shared.state is not None:
+                error, message = shared.state
+                shared.handle.release()
+                raise error(message)
+        _shared_programs[signature] = shared
+        self._add_program(program_name, shared, locations)
+
+    def _link_stages(self, program, stages, locations, varyings):
+        # type: (int, tuple, Optional[dict], Optional[Sequence[str]]) -> tuple
+        attached = []
+        for shader_type, compiled, name in stages:
+            shader_id = compiled.get(name)
+            if shader_id is None and (shader_type, name) in self._sources:
+                shader_id = self._compile_source(shader_type, compiled, name, self._sources[shader_type, name])
+            if shader_id is not None:
+                GL.glAttachShader(program, shader_id)
+                attached.append(shader_id)
+
+        if locations is not None:
+            for name, location in locations.items():
+                GL.glBindAttribLocation(program, location, name)
+
+        if varyings:
+            names = (ctypes.c_char_p * len(varyings))(*(name.encode() for name in varyings))
+            GL.glTransformFeedbackVaryings(program, len(varyings),
+                                           ctypes.cast(names, ctypes.POINTER(ctypes.POINTER(GL.GLchar))),
+                                           GL.GL_INTERLEAVED_ATTRIBS)
 
         GL.glLinkProgram(program)
-        if not GL.glGetProgramiv(program, GL.GL_LINK_STATUS):
-            message = GL.glGetProgramInfoLog(program).decode(errors='ignore')
-            raise RuntimeError("ShaderProgramErrorMessage: '{}'".format(message))
-
-        uniforms = ()
-        if vertex_id is not None:
-            GL.glDetachShader(program, vertex_id)
-            uniforms += self._vert_uniforms[shaders['vertex']]
-        if geometry_id is not None:
-            GL.glDetachShader(program, geometry_id)
-            uniforms += self._geom_uniforms[shaders['geometry']]
-        if fragment_id is not None:
-            GL.glDetachShader(program, fragment_id)
-            uniforms += self._frag_uniforms[shaders['fragment']]
-
-        self._shaderprograms[program_name] = program
-        self._uniforms[program_name] = uniforms
+        for shader_id in attached:
+            GL.glDetachShader(program, shader_id)
+        return tuple(attached)
+
+    def _wait(self, shared):
+        # type: (_SharedObject) -> None
+        # Waits for the program, if the driver is still working on it, and sets its final state.
+        if not isinstance(shared.state, _Pending):
+            return
+        signature, attached, key = shared.state
+        shared.state = None
+        program = shared.name
+        if GL.glGetProgramiv(program, GL.GL_LINK_STATUS):
+            if key is not None:
+                self._cache.store(key, program)
+            return
+        # a shader that failed to compile fails the link too; its log tells more
+        shared.state = RuntimeError, "ShaderProgramErrorMessage: '{}'".format(
+            GL.glGetProgramInfoLog(program).decode(errors='ignore'))
+        for shader_id in attached:
+            if GL.glIsShader(shader_id) and not GL.glGetShaderiv(shader_id, GL.GL_COMPILE_STATUS):
+                shared.state = ShaderCompileError, GL.glGetShaderInfoLog(shader_id)
+                break
+        # linking the same shaders again will try again
+        if _shared_programs.get(signature) is shared:
+            del _shared_programs[signature]
+
+    def _check(self, program_name):
+        # type: (str) -> None
+        # raises the errors of a deferred program, which is dropped then
+        shared = self._handles[PROGRAM, program_name]   # type: _SharedObject
+        self._wait(shared)
+        if shared.state is not None:
+            error, message = shared.state
+            del self._shaderprograms[program_name]
+            del self._locations[program_name]
+            self._handles.pop((PROGRAM, program_name)).release()
+            raise error(message)
+
+    def ready(self, program_name):
+        # type: (str) -> bool
+        # False while the driver is still compiling or linking the program in the background, so that build()
+        # would wait for it. That's only known with GL_KHR_parallel_shader_compile; True without it.
+        if program_name not in self._shaderprograms:
+            raise ValueError("'{}' not found.".format(program_name))
+        shared = self._handles[PROGRAM, program_name]   # type: _SharedObject
+        if not isinstance(shared.state, _Pending) or not _parallel_compile():
+            return True
+        # PyOpenGL doesn't know the size of this query's result, so it's given the storage
+        status = GL.GLint()
+        GL.glGetProgramiv(shared.name, GL_COMPLETION_STATUS_KHR, ctypes.byref(status))
+        return bool(status.value)
+
+    def _add_program(self, program_name, shared, locations):
+        # type: (str, _SharedObject, Optional[dict]) -> None
+        shared.users += 1
+        if program_name in self._shaderprograms:
+            self._handles.pop((PROGRAM, program_name)).release()
+        self._shaderprograms[program_name] = shared.name
+        self._handles[PROGRAM, program_name] = shared
+        self._locations[program_name] = locations
 
     def build(self, program_name, *uniforms):
         # type: (str, ...) -> ShaderProgram
         if program_name not in self._shaderprograms:
             raise ValueError("'{}' not found.".format(program_name))
-        if len(uniforms) == 0:
-            uniforms = self._uniforms[program_name]
-        return ShaderProgram(self._shaderprograms[program_name], *uniforms)
+        # The active uniforms are found by the ShaderProgram itself; the names given are only needed for those
+        # it doesn't list (e.g. array elements or struct fields, looked up once there).
+        self._check(program_name)
+        return ShaderProgram(self._shaderprograms[program_name], *uniforms,
+                             locations=self._locations[program_name], owner=self)
+
+    def release_shaders(self):
+        # type: () -> None
+        # Compiled shaders are only needed to link programs; linked programs keep working without them.
+        for shader_type, shaders in ((GL.GL_VERTEX_SHADER, self._vertshaders),
+                                     (GL.GL_GEOMETRY_SHADER, self._geomshaders),
+                                     (GL.GL_FRAGMENT_SHADER, self._fragshaders)):
+            for shader_name in shaders:
+                self._handles.pop((shader_type, shader_name)).release()
+            shaders.clear()
+
+    def release(self):
+        # type: () -> None
+        # Deletes the shaders and programs, including those in use by the ShaderProgram objects built, unless
+        # other ShaderProgramData objects share them.
+        self.release_shaders()
+        for program_name in self._shaderprograms:
+            self._handles.pop((PROGRAM, program_name)).release()
+        self._shaderprograms.clear()
@@ -0,0 +1,145 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import ctypes
+import hashlib
+import json
+import os
+import os.path as path
+import struct
+import OpenGL.GL as GL
+from OpenGL.error import GLError
+from typing import Optional, Sequence, Tuple
+
+__all__ = [
+    'ProgramCache',
+]
+
+# File layout: magic, binary format (uint32), then the program binary as returned by the driver.
+MAGIC = b'EGLPROG1'
+_HEADER = struct.Struct('<I')
+
+
+class ProgramCache(object):
+
+    # Linked program binaries on disk, so programs linked before (by the same driver) skip the compiler.
+    # Binaries are only valid for the driver that produced them, which is part of every key.
+
+    def __init__(self, directory):
+        # type: (str) -> None
+        self._directory = directory
+        self._driver = None
+
+    @property
+    def driver(self):
+        # type: () -> str
+        # vendor, renderer and version strings of the current context's driver
+        if self._driver is None:
+            self._driver = ' / '.join(
+                GL.glGetString(name).decode(errors='ignore')
+                for name in (GL.GL_VENDOR, GL.GL_RENDERER, GL.GL_VERSION)
+            )
+        return self._driver
+
+    def key(self, sources, locations=None, varyings=None):
+        # type: (Sequence[Tuple[int, str]], Optional[dict], Optional[Sequence[str]]) -> str
+        # 'sources' are the (shader type, code) pairs linked together; bound attribute locations and
+        # transform feedback varyings change the binary too.
+        content = json.dumps([
+            MAGIC.decode(), self.driver, sorted(sources), sorted((locations or {}).items()), list(varyings or ())
+        ])
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def filename(self, key):
+        # type: (str) -> str
+        return path.join(self._directory, key + '.prog')
+
+    def store(self, key, program):
+        # type: (str, int) -> bool
+        # The program should have been linked with GL_PROGRAM_BINARY_RETRIEVABLE_HINT set.
+        size = GL.glGetProgramiv(program, GL.GL_PROGRAM_BINARY_LENGTH)
+        if size <= 0:
+            return False
+        binary = (ctypes.c_ubyte * size)()
+        length = GL.GLsizei()
+        binary_format = GL.GLenum()
+        GL.glGetProgramBinary(program, size, ctypes.byref(length), ctypes.byref(binary_format), binary)
+        if length.value <= 0:
+            return False
+
+        if not path.isdir(self._directory):
+            os.makedirs(self._directory)
+        filename = self.filename(key)
+        temporary = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(temporary, 'wb') as stream:
+            stream.write(MAGIC)
+            stream.write(_HEADER.pack(binary_format.value))
+            stream.write(memoryview(binary)[:length.value])
+        # readers never see a partially written file
+        os.replace(temporary, filename)
+        return True
+
+    def load(self, key, program):
+        # type: (str, int) -> bool
+        # Loads the cached binary into 'program'; False if there's none or the driver rejects it (e.g. after
+        # an update that kept the version string), in which case the program must be linked from sources.
+        filename = self.filename(key)
+        if not path.isfile(filename):
+            return False
+        with open(filename, 'rb') as stream:
+            content = stream.read()
+        start = len(MAGIC) + _HEADER.size
+        if content[:len(MAGIC)] != MAGIC or len(content) <= start:
+            self.discard(key)
+            return False
+        binary_format, = _HEADER.unpack_from(content, len(MAGIC))
+        try:
+            GL.glProgramBinary(program, binary_format, content[start:], len(content) - start)
+        except GLError:
+            # a format this driver doesn't know anymore
+            self.discard(key)
+            return False
+        if not GL.glGetProgramiv(program, GL.GL_LINK_STATUS):
+            self.discard(key)
+            return False
+        return True
+
+    def discard(self, key):
+        # type: (str) -> None
+        filename = self.filename(key)
+        if path.isfile(filename):
+            os.remove(filename)
+
+    def clear(self):
+        # type: () -> None
+        if not path.isdir(self._directory):
+            return
+        for name in os.listdir(self._directory):
+            if name.endswith('.prog'):
+                os.remove(path.join(self._directory, name))
@@ -28,15 +28,145 @@
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 import OpenGL.GL as GL
+from collections import namedtuple as nt
 from ..arrays import DType, DTypeInfo
-from typing import Union
+from ..glstate import gl_state
+from typing import Union, Optional, Callable, Any
 
 __all__ = [
     'UniformData',
+    'ActiveVariable',
+    'active_uniforms',
+    'active_attributes',
     'ShaderProgram',
 ]
 
 
+# the DType of one element of each GLSL type (without the array size)
+_GLSL_TYPES = {
+    GL.GL_BOOL: DType.bool,
+    GL.GL_BOOL_VEC2: DType.bool_v2,
+    GL.GL_BOOL_VEC3: DType.bool_v3,
+    GL.GL_BOOL_VEC4: DType.bool_v4,
+    GL.GL_INT: DType.int,
+    GL.GL_INT_VEC2: DType.int_v2,
+    GL.GL_INT_VEC3: DType.int_v3,
+    GL.GL_INT_VEC4: DType.int_v4,
+    GL.GL_UNSIGNED_INT: DType.uint,
+    GL.GL_UNSIGNED_INT_VEC2: DType.uint_v2,
+    GL.GL_UNSIGNED_INT_VEC3: DType.uint_v3,
+    GL.GL_UNSIGNED_INT_VEC4: DType.uint_v4,
+    GL.GL_FLOAT: DType.float,
+    GL.GL_FLOAT_VEC2: DType.float_v2,
+    GL.GL_FLOAT_VEC3: DType.float_v3,
+    GL.GL_FLOAT_VEC4: DType.float_v4,
+    GL.GL_DOUBLE: DType.double,
+    GL.GL_DOUBLE_VEC2: DType.double_v2,
+    GL.GL_DOUBLE_VEC3: DType.double_v3,
+    GL.GL_DOUBLE_VEC4: DType.double_v4,
+    GL.GL_FLOAT_MAT2: DType.float_m2,
+    GL.GL_FLOAT_MAT2x3: DType.float_m23,
+    GL.GL_FLOAT_MAT2x4: DType.float_m24,
+    GL.GL_FLOAT_MAT3: DType.float_m3,
+    GL.GL_FLOAT_MAT3x2: DType.float_m32,
+    GL.GL_FLOAT_MAT3x4: DType.float_m34,
+    GL.GL_FLOAT_MAT4: DType.float_m4,
+    GL.GL_FLOAT_MAT4x2: DType.float_m42,
+    GL.GL_FLOAT_MAT4x3: DType.float_m43,
+    GL.GL_DOUBLE_MAT2: DType.double_m2,
+    GL.GL_DOUBLE_MAT2x3: DType.double_m23,
+    GL.GL_DOUBLE_MAT2x4: DType.double_m24,
+    GL.GL_DOUBLE_MAT3: DType.double_m3,
+    GL.GL_DOUBLE_MAT3x2: DType.double_m32,
+    GL.GL_DOUBLE_MAT3x4: DType.double_m34,
+    GL.GL_DOUBLE_MAT4: DType.double_m4,
+    GL.GL_DOUBLE_MAT4x2: DType.double_m42,
+    GL.GL_DOUBLE_MAT4x3: DType.double_m43,
+}
+
+# samplers are set with the texture unit they read from
+for _prefix in ('GL_SAMPLER_', 'GL_INT_SAMPLER_', 'GL_UNSIGNED_INT_SAMPLER_'):
+    for _suffix in ('1D', '2D', '3D', 'CUBE', '1D_ARRAY', '2D_ARRAY', 'CUBE_MAP_ARRAY', 'BUFFER', '2D_RECT',
+                    '2D_MULTISAMPLE', '2D_MULTISAMPLE_ARRAY', '1D_SHADOW', '2D_SHADOW', 'CUBE_SHADOW',
+                    '1D_ARRAY_SHADOW', '2D_ARRAY_SHADOW', 'CUBE_MAP_ARRAY_SHADOW', '2D_RECT_SHADOW'):
+        _gl_type = getattr(GL, _prefix + _suffix, None)
+        if _gl_type is not None:
+            _GLSL_TYPES[_gl_type] = DType.int
+
+
+# An active uniform or attribute of a linked program. Arrays are named without their '[0]' suffix, and 'size'
+# is their number of elements (1 otherwise). 'dtype' is None for the types that can't be set as values
+# (e.g. images).
+ActiveVariable = nt("ActiveVariable", "name location gl_type size dtype")
+
+
+def _active_variables(program, count_pname, get_active, get_location):
+    # type: (int, int, Callable, Callable) -> dict
+    variables = {}
+    for index in range(GL.glGetProgramiv(program, count_pname)):
+        name, size, gl_type = get_active(program, index)
+        name = name.decode()
+        location = get_location(program, name)
+        # members of uniform blocks have no location: they're set through their buffer
+        if location == -1:
+            continue
+        if name.endswith('[0]'):
+            name = name[:-3]
+        variables[name] = ActiveVariable(name, location, int(gl_type), int(size), _GLSL_TYPES.get(int(gl_type)))
+    return variables
+
+
+def active_uniforms(program):
+    # type: (int) -> dict
+    # the uniforms of a linked program still in use after compilation, by name
+    return _active_variables(program, GL.GL_ACTIVE_UNIFORMS, GL.glGetActiveUniform, GL.glGetUniformLocation)
+
+
+def active_attributes(program):
+    # type: (int) -> dict
+    # the vertex attributes of a linked program still in use after compilation, by name
+    return _active_variables(program, GL.GL_ACTIVE_ATTRIBUTES, GL.glGetActiveAttrib, GL.glGetAttribLocation)
+
+
+def _setter(uniform):
+    # type: (ActiveVariable) -> Callable[[Any], None]
+    # The function loading a value into the uniform, chosen once from its type: a number for scalars, a sequence
+    # for vectors, and for matrices (column-major) and arrays, a flat sequence of all their elements' values.
+    location, dtype = uniform.location, uniform.dtype
+    load = dtype.uniform
+    if dtype.columns[0] > 1:
+        size = dtype.size
+        return lambda value: load(location, len(value) // size, False, value)
+    if uniform.size > 1:
+        load = getattr(GL, load.__name__ + 'v')
+        size = dtype.size
+        return lambda value: load(location, len(value) // size, value)
+    if dtype.size > 1:
+        return lambda value: load(location, *value)
+    return lambda value: load(location, value)
+
+
+def _ignore(value):
+    # type: (Any) -> None
+    pass
+
+
+class _UniformLocations(dict):
+    __slots__ = 'program',
+
+    def __init__(self, program):
+        # type: (int) -> None
+        super(_UniformLocations, self).__init__()
+        self.program = program
+
+    def __missing__(self, name):
+        # type: (str) -> int
+        # names not among the active uniforms (array elements, struct fields, or uniforms removed by the
+        # compiler, which get -1 and are then ignored by GL) are looked up once
+        location = self[name] = GL.glGetUniformLocation(self.program, name)
+        return location
+
+
 class UniformData(object):
     __slots__ = 'location', 'dtype'
 
@@ -53,17 +183,26 @@ class UniformData(object):
 
 class ShaderProgram(object):
 
-    def __init__(self, shader_id, *uniforms):
+    def __init__(self, shader_id, *uniforms, locations=None, owner=None):
         self._id = shader_id
-        GL.glUseProgram(shader_id)
-        self._uniforms = {
-            name: GL.glGetUniformLocation(shader_id, name) for name in uniforms
+        self._locations = locations
+        # the ShaderProgramData owning the program, kept alive (with the program) as long as this object is
+        self._owner = owner
+        # found by reflection, with a setter made for each from its type
+        self._active = active_uniforms(shader_id)
+        self._setters = {
+            name: _setter(uniform) for name, uniform in self._active.items() if uniform.dtype is not None
         }
-        GL.glUseProgram(0)
+        self._uniforms = _UniformLocations(shader_id)
+        for name, uniform in self._active.items():
+            self._uniforms[name] = uniform.location
+        # other names asked for (e.g. array elements or struct fields) are looked up now rather than on first use
+        for name in uniforms:
+            self._uniforms[name]
         self._tex_unit = 0
 
     def __getattr__(self, name):
-        if name not in ('_id', '_uniforms'):
+        if name not in ('_id', '_uniforms', '_locations', '_owner', '_active', '_setters'):
             if name in getattr(self, '_uniforms'):
                 return getattr(self, '_uniforms')[name]
             else:
@@ -72,7 +211,7 @@ class ShaderProgram(object):
             return getattr(self, '__dict__')[name]
 
     def __setattr__(self, name, value):
-        if name not in ('_id', '_uniforms'):
+        if name not in ('_id', '_uniforms', '_locations', '_owner', '_active', '_setters'):
             getattr(self, '_uniforms')[name] = value
         else:
             getattr(self, '__dict__')[name] = value
@@ -82,24 +221,47 @@ class ShaderProgram(object):
         # type: () -> int
         return self._id
 
+    @property
+    def attribute_locations(self):
+        # type: () -> Optional[dict]
+        # the attribute locations bound at link time, if any
+        return self._locations
+
+    @property
+    def uniforms(self):
+        # type: () -> dict
+        # the active uniforms (ActiveVariable objects) by name
+        return dict(self._active)
+
+    @property
+    def attributes(self):
+        # type: () -> dict
+        # the active vertex attributes (ActiveVariable objects) by name
+        return active_attributes(self._id)
+
+    def load(self, name, value):
+        # type: (str, Any) -> None
+        # Loads the value the way the uniform's type needs it (see _setter). As with a location of -1, names of
+        # no active uniform are ignored.
+        self._setters.get(name, _ignore)(value)
+
     def set_texture(self, name, texture_id, index=0):
         # type: (str, int, int) -> None
-        GL.glActiveTexture(GL.GL_TEXTURE0 + index)
-        GL.glBindTexture(GL.GL_TEXTURE_2D, texture_id)
+        gl_state.bind_texture(texture_id, index)
         GL.glUniform1i(GL.glGetUniformLocation(self._id, name), index)
 
     def use(self):
         # type: () -> None
-        GL.glUseProgram(self._id)
+        gl_state.use_program(self._id)
 
     def unbind(self):
         # type: () -> None
+        # Not needed between draws: the next use() replaces the program anyway.
         if self._tex_unit > 0:
             for i in range(1, self._tex_unit):
-                GL.glActiveTexture(GL.GL_TEXTURE0 + i)
-                GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+                gl_state.bind_texture(0, i)
             self._tex_unit = 0
-        GL.glUseProgram(0)
+        gl_state.use_program(0)
 
     def load1f(self, name, v0):
         # type: (str, float) -> None
@@ -239,8 +401,7 @@ class ShaderProgram(object):
 
     def load_sampler2d(self, name, texture_id, texture_unit):
         # type: (str, int, int) -> None
-        GL.glActiveTexture(GL.GL_TEXTURE0 + texture_unit)
-        GL.glBindTexture(GL.GL_TEXTURE_2D, texture_id)
+        gl_state.bind_texture(texture_id, texture_unit)
         GL.glUniform1i(self._uniforms[name], texture_unit)
         if self._tex_unit < texture_unit:
             self._tex_unit = texture_unit
\ No newline at end of file
@@ -27,7 +27,6 @@
 #
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-import struct
 import math
 from collections import namedtuple as nt
 from typing import Union, Sequence, Iterable, Container
@@ -56,6 +55,11 @@ V4 = ("xy xz xw yx yz yw zx zy zw wx wy wz "
       "brga brag bgra bgar barg bagr argb arbg agrb agbr abrg abgr").split()
 
 
+# compiled once, so packing never parses a format string
+_FLOAT_V2, _FLOAT_V3, _FLOAT_V4 = DType.float_v2.packer(), DType.float_v3.packer(), DType.float_v4.packer()
+_DOUBLE_V2, _DOUBLE_V3, _DOUBLE_V4 = DType.double_v2.packer(), DType.double_v3.packer(), DType.double_v4.packer()
+
+
 def getargs(l, *args):
     # type: (list, ...) -> None
     for i in args:   # type: Union[int, float, Iterable]
@@ -441,54 +445,34 @@ class Vec2(Arithvector):
 
     @staticmethod
     def bytesize(as_double=False):
-        if as_double:
-            return struct.calcsize(DType.double_v2.format)
-        return struct.calcsize(DType.float_v2.format)
+        return (_DOUBLE_V2 if as_double else _FLOAT_V2).size
 
     @staticmethod
     def pack_values(*values, as_double=False):
-        if as_double:
-            fmt = DType.double_v2.format
-        else:
-            fmt = DType.float_v2.format
-        return struct.pack(fmt, *values)
+        packer = _DOUBLE_V2 if as_double else _FLOAT_V2
+        return packer.pack(*values)
 
     def pack(self, as_double=False):
-        if as_double:
-            fmt = DType.double_v2.format
-        else:
-            fmt = DType.float_v2.format
-        return struct.pack(fmt, self.x, self.y)
+        packer = _DOUBLE_V2 if as_double else _FLOAT_V2
+        return packer.pack(self.x, self.y)
 
     def unpack(self, buffer, as_double=False):
-        if as_double:
-            fmt = DType.double_v2.format
-        else:
-            fmt = DType.float_v2.format
-        self.x, self.y = struct.unpack(fmt, buffer)
+        packer = _DOUBLE_V2 if as_double else _FLOAT_V2
+        self.x, self.y = packer.unpack(buffer)
         return self
 
     def pack_into(self, buffer, offset, as_double=False):
-        if as_double:
-            fmt = DType.double_v2.format
-        else:
-            fmt = DType.float_v2.format
-        struct.pack_into(fmt, buffer, offset, self.x, self.y)
+        packer = _DOUBLE_V2 if as_double else _FLOAT_V2
+        packer.pack_into(buffer, offset, self.x, self.y)
 
     @staticmethod
     def pack_values_into(*values, buffer, offset, as_double=False):
-        if as_double:
-            fmt = DType.double_v2.format
-        else:
-            fmt = DType.float_v2.format
-        struct.pack_into(fmt, buffer, offset, *values)
+        packer = _DOUBLE_V2 if as_double else _FLOAT_V2
+        packer.pack_into(buffer, offset, *values)
 
     def unpack_from(self, buffer, offset, as_double=False):
-        if as_double:
-            fmt = DType.double_v2.format
-        else:
-            fmt = DType.float_v2.format
-        self.x, self.y = struct.unpack_from(fmt, buffer, offset)
+        packer = _DOUBLE_V2 if as_double else _FLOAT_V2
+        self.x, self.y = packer.unpack_from(buffer, offset)
         return self
 
 
@@ -619,54 +603,34 @@ class Vec3(Arithvector):
 
     @staticmethod
     def bytesize(as_double=False):
-        if as_double:
-            return struct.calcsize(DType.double_v2.format)
-        return struct.calcsize(DType.float_v2.format)
+        return (_DOUBLE_V3 if as_double else _FLOAT_V3).size
 
     @staticmethod
     def pack_values(*values, as_double=False):
-        if as_double:
-            fmt = DType.double_v3.format
-        else:
-            fmt = DType.float_v3.format
-        return struct.pack(fmt, *values)
+        packer = _DOUBLE_V3 if as_double else _FLOAT_V3
+        return packer.pack(*values)
 
     def pack(self, as_double=False):
-        if as_double:
-            fmt = DType.double_v3.format
-        else:
-            fmt = DType.float_v3.format
-        return struct.pack(fmt, self.x, self.y, self.z)
+        packer = _DOUBLE_V3 if as_double else _FLOAT_V3
+        return packer.pack(self.x, self.y, self.z)
 
     def unpack(self, buffer, as_double=False):
-        if as_double:
-            fmt = DType.double_v3.format
-        else:
-            fmt = DType.float_v3.format
-        self.x, self.y, self.z = struct.unpack(fmt, buffer)
+        packer = _DOUBLE_V3 if as_double else _FLOAT_V3
+        self.x, self.y, self.z = packer.unpack(buffer)
         return self
 
     def pack_into(self, buffer, offset, as_double=False):
-        if as_double:
-            fmt = DType.double_v3.format
-        else:
-            fmt = DType.float_v3.format
-        struct.pack_into(fmt, buffer, offset, self.x, self.y, self.z)
+        packer = _DOUBLE_V3 if as_double else _FLOAT_V3
+        packer.pack_into(buffer, offset, self.x, self.y, self.z)
 
     @staticmethod
     def pack_values_into(*values, buffer, offset, as_double=False):
-        if as_double:
-            fmt = DType.double_v3.format
-        else:
-            fmt = DType.float_v3.format
-        struct.pack_into(fmt, buffer, offset, *values)
+        packer = _DOUBLE_V3 if as_double else _FLOAT_V3
+        packer.pack_into(buffer, offset, *values)
 
     def unpack_from(self, buffer, offset, as_double=False):
-        if as_double:
-            fmt = DType.double_v3.format
-        else:
-            fmt = DType.float_v3.format
-        self.x, self.y, self.z = struct.unpack_from(fmt, buffer, offset)
+        packer = _DOUBLE_V3 if as_double else _FLOAT_V3
+        self.x, self.y, self.z = packer.unpack_from(buffer, offset)
 
 
 class Vec4(Arithvector):
@@ -803,54 +767,34 @@ class Vec4(Arithvector):
 
     @staticmethod
     def bytesize(as_double=False):
-        if as_double:
-            return struct.calcsize(DType.double_v2.format)
-        return struct.calcsize(DType.float_v2.format)
+        return (_DOUBLE_V4 if as_double else _FLOAT_V4).size
 
     @staticmethod
     def pack_values(*values, as_double=False):
-        if as_double:
-            fmt = DType.double_v4.format
-        else:
-            fmt = DType.float_v4.format
-        return struct.pack(fmt, *values)
+        packer = _DOUBLE_V4 if as_double else _FLOAT_V4
+        return packer.pack(*values)
 
     def pack(self, as_double=False):
-        if as_double:
-            fmt = DType.double_v4.format
-        else:
-            fmt = DType.float_v4.format
-        return struct.pack(fmt, self.x, self.y, self.z, self.w)
+        packer = _DOUBLE_V4 if as_double else _FLOAT_V4
+        return packer.pack(self.x, self.y, self.z, self.w)
 
     def unpack(self, buffer, as_double=False):
-        if as_double:
-            fmt = DType.double_v4.format
-        else:
-            fmt = DType.float_v4.format
-        self.x, self.y, self.z, self.w = struct.unpack(fmt, buffer)
+        packer = _DOUBLE_V4 if as_double else _FLOAT_V4
+        self.x, self.y, self.z, self.w = packer.unpack(buffer)
         return self
 
     def pack_into(self, buffer, offset, as_double=False):
-        if as_double:
-            fmt = DType.double_v4.format
-        else:
-            fmt = DType.float_v4.format
-        struct.pack_into(fmt, buffer, offset, self.x, self.y, self.z, self.w)
+        packer = _DOUBLE_V4 if as_double else _FLOAT_V4
+        packer.pack_into(buffer, offset, self.x, self.y, self.z, self.w)
 
     @staticmethod
     def pack_values_into(*values, buffer, offset, as_double=False):
-        if as_double:
-            fmt = DType.double_v4.format
-        else:
-            fmt = DType.float_v4.format
-        struct.pack_into(fmt, buffer, offset, *values)
+        packer = _DOUBLE_V4 if as_double else _FLOAT_V4
+        packer.pack_into(buffer, offset, *values)
 
     def unpack_from(self, buffer, offset, as_double=False):
-        if as_double:
-            fmt = DType.double_v4.format
-        else:
-            fmt = DType.float_v4.format
-        self.x, self.y, self.z, self.w = struct.unpack_from(fmt, buffer, offset)
+        packer = _DOUBLE_V4 if as_double else _FLOAT_V4
+        self.x, self.y, self.z, self.w = packer.unpack_from(buffer, offset)
 
 
 class FrozenVec4(nt('FrozenVec4', 'x y z w'), Arithvector):
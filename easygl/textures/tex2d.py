@@ -32,6 +32,8 @@ import pygame.image as image
 from pygame import Surface
 from collections import namedtuple as nt
 from enum import Enum
+from ..glstate import gl_state
+from ..resources import GLHandle, TEXTURE, texture_pool
 
 __all__ = [
     'Filter',
@@ -40,6 +42,7 @@ __all__ = [
     'TexSubImageDescriptor',
     'TextureData',
     'Wrap',
+    'texture_bytes',
 ]
 
 
@@ -183,8 +186,7 @@ class TexDescriptor(nt("TexDescriptor", "id width height flip mipmap wrap filter
 
     def uniform(self, shader_id, name, texture_unit=0):
         # type: (int, str, int) -> None
-        GL.glActiveTexture(GL.GL_TEXTURE0 + texture_unit)
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self.id)
+        gl_state.bind_texture(self.id, texture_unit)
         GL.glUniform1i(GL.glGetUniformLocation(shader_id, name), texture_unit)
 
     @property
@@ -198,11 +200,38 @@ class TexDescriptor(nt("TexDescriptor", "id width height flip mipmap wrap filter
         return (x / float(self.width - 1)) % 1.0, (y / float(self.height - 1)) % 1.0
 
 
+def texture_bytes(width, height, pixel_size, mipmapped=False):
+    # type: (int, int, int, bool) -> int
+    # the memory taken by a 2D texture, with its whole mip chain (down to 1x1) if mipmapped
+    size = width * height * pixel_size
+    while mipmapped and (width > 1 or height > 1):
+        width = max(1, width // 2)
+        height = max(1, height // 2)
+        size += width * height * pixel_size
+    return size
+
+
 class TextureData(object):
 
     def __init__(self):
         # type: () -> None
         self._descriptors = {}
+        self._handles = {}
+
+    @staticmethod
+    def _acquire(width, height, gl_channels):
+        # type: (int, int, int) -> int
+        # a pooled texture of the same size and format, if any; its storage is respecified anyway
+        texture = texture_pool.acquire((width, height, gl_channels))
+        return texture if texture is not None else GL.glGenTextures(1)
+
+    def _own(self, tex_name, texture, width, height, gl_channels, mipmap):
+        # type: (str, int, int, int, int, MipMap) -> None
+        if tex_name in self._handles:
+            self._handles.pop(tex_name).release()
+        size = texture_bytes(width, height, 4 if gl_channels == GL.GL_RGBA else 3, mipmap is not MipMap.none)
+        self._handles[tex_name] = GLHandle(self, TEXTURE, texture, size, texture_pool, (width, height, gl_channels),
+                                           tex_name)
 
     def load_from_file(self, tex_name, file_name, has_alpha, flip_vertically, mipmap, wrap, filtering):
         # type: (str, str, bool, bool, MipMap, Wrap, Filter) -> None
@@ -210,8 +239,16 @@ class TextureData(object):
 
         width, height = data.get_size()
 
-        texture = GL.glGenTextures(1)
-        GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+        if has_alpha:
+            gl_channels = GL.GL_RGBA
+            channels = 'RGBA'
+            data = data.convert_alpha()
+        else:
+            gl_channels = GL.GL_RGB
+            channels = 'RGB'
+
+        texture = self._acquire(width, height, gl_channels)
+        gl_state.bind_texture(texture)
 
         # Set the texture wrapping parameters
         wrap_value = {
@@ -231,14 +268,6 @@ class TextureData(object):
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, filter_value)
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, filter_value)
 
-        if has_alpha:
-            gl_channels = GL.GL_RGBA
-            channels = 'RGBA'
-            data = data.convert_alpha()
-        else:
-            gl_channels = GL.GL_RGB
-            channels = 'RGB'
-
         data = image.tostring(data, channels, flip_vertically)
         GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, gl_channels, width, height, 0, gl_channels, GL.GL_UNSIGNED_BYTE, data)
 
@@ -253,8 +282,9 @@ class TextureData(object):
             GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, mipmap_value)
             GL.glGenerateMipmap(GL.GL_TEXTURE_2D)
 
-        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        gl_state.bind_texture(0)
 
+        self._own(tex_name, texture, width, height, gl_channels, mipmap)
         self._descriptors[tex_name] = TexDescriptor(texture, width, height, flip_vertically, mipmap, wrap, filtering)
 
     def capture_from_screen(self, tex_name, left, top, width, height, has_alpha, mipmap, wrap, filtering):
@@ -270,8 +300,8 @@ class TextureData(object):
             gl_channels = GL.GL_RGB
         data = GL.glReadPixels(left, top, width, height, gl_channels, GL.GL_UNSIGNED_BYTE)
 
-        texture = GL.glGenTextures(1)
-        GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+        texture = self._acquire(width, height, gl_channels)
+        gl_state.bind_texture(texture)
 
         # Set the texture wrapping parameters
         wrap_value = {
@@ -304,8 +334,9 @@ class TextureData(object):
             GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, mipmap_value)
             GL.glGenerateMipmap(GL.GL_TEXTURE_2D)
 
-        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        gl_state.bind_texture(0)
 
+        self._own(tex_name, texture, width, height, gl_channels, mipmap)
         self._descriptors[tex_name] = TexDescriptor(texture, width, height, False, mipmap, wrap, filtering)
 
     def create_from_surface(self, tex_name, surface, has_alpha, flip_vertically, mipmap, wrap, filtering):
@@ -319,8 +350,8 @@ class TextureData(object):
         width, height = surface.get_size()
         data = image.tostring(surface, fmt, flip_vertically)
 
-        texture = GL.glGenTextures(1)
-        GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+        texture = self._acquire(width, height, gl_channels)
+        gl_state.bind_texture(texture)
 
         # Set the texture wrapping parameters
         wrap_value = {
@@ -353,8 +384,9 @@ class TextureData(object):
             GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, mipmap_value)
             GL.glGenerateMipmap(GL.GL_TEXTURE_2D)
 
-        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        gl_state.bind_texture(0)
 
+        self._own(tex_name, texture, width, height, gl_channels, mipmap)
         self._descriptors[tex_name] = TexDescriptor(texture, width, height, False, mipmap, wrap, filtering)
 
     def __getitem__(self, key):
@@ -364,11 +396,19 @@ class TextureData(object):
     def __delitem__(self, key):
         # type: (str) -> None
         self._descriptors.__delitem__(key)
+        self._handles.pop(key).release()
+
+    def release(self):
+        # type: () -> None
+        # Deletes (or pools) every texture; the TexDescriptor objects handed out become invalid.
+        for handle in self._handles.values():
+            handle.release()
+        self._handles.clear()
+        self._descriptors.clear()
 
     @staticmethod
     def unbind_all():
         # type: () -> None
         for i in range(1, 16):
-            GL.glActiveTexture(GL.GL_TEXTURE0 + i)
-            GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
-        GL.glActiveTexture(GL.GL_TEXTURE0)
+            gl_state.bind_texture(0, i)
+        gl_state.active_texture(0)
@@ -1,4 +1,4 @@
-from distutils.core import setup
+from setuptools import setup
 
 setup(
     name='easygl',
@@ -11,9 +11,14 @@ setup(
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
-        'Programmin Language :: Python :: 3.4',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3.8',
     ],
-    setup_requires=['pygame', 'PyOpenGL', 'typing'],
+    python_requires='>=3.8',
+    setup_requires=['pygame', 'PyOpenGL'],
+    extras_require={
+        'numpy': ['numpy'],
+    },
     keywords='games easygl opengl gl graphics textures geometry rendering gamedev pygame PyOpenGL',
     author='Jorge A. G.',
     author_email='jorgegomes83@hotmail.com',
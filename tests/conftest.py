@@ -0,0 +1,87 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+# The tests draw headless: an OpenGL 3.3 core context on an EGL pbuffer (e.g. Mesa's llvmpipe, with
+# EGL_PLATFORM=surfaceless). PyOpenGL picks its platform on import, so it's chosen before anything imports it.
+
+import os
+import ctypes
+import pytest
+
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+
+
+def _make_context():
+    # type: () -> None
+    from OpenGL import EGL
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("no EGL display.")
+    attributes = (EGL.EGLint * 5)(EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+                                  EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_NONE)
+    config = EGL.EGLConfig()
+    count = EGL.EGLint()
+    if not EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(count)) \
+            or count.value == 0:
+        raise RuntimeError("no EGL config for desktop OpenGL.")
+    surface = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * 5)(EGL.EGL_WIDTH, 64, EGL.EGL_HEIGHT, 64,
+                                                                            EGL.EGL_NONE))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, (EGL.EGLint * 7)(
+        EGL.EGL_CONTEXT_MAJOR_VERSION, 3, EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+        EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT, EGL.EGL_NONE))
+    if not context or not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("no OpenGL 3.3 core context.")
+
+
+@pytest.fixture(scope='session')
+def gl():
+    # the OpenGL module, with a current context; without one (no EGL library, display or 3.3 core support)
+    # the tests are skipped, but any other error fails them
+    from OpenGL.error import Error
+    try:
+        _make_context()
+    except (ImportError, OSError, RuntimeError, Error) as error:
+        pytest.skip("no headless OpenGL context: {}".format(error))
+    import OpenGL.GL as GL
+    return GL
+
+
+@pytest.fixture
+def read_buffer(gl):
+    # the contents of a GL buffer object, as bytes; read through the copy target, which the state cache
+    # doesn't shadow
+    def read(buffer, size, offset=0):
+        gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, buffer)
+        data = bytes(gl.glGetBufferSubData(gl.GL_COPY_READ_BUFFER, offset, size))
+        gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, 0)
+        return data
+    return read
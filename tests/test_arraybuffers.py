@@ -0,0 +1,369 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import ctypes
+import struct
+import pytest
+
+VERTEX_SHADER = """
+#version 330 core
+in vec2 position;
+in vec4 color;
+out vec4 frag_color;
+void main() {
+    frag_color = color;
+    gl_Position = vec4(position, 0., 1.);
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330 core
+in vec4 frag_color;
+out vec4 out_color;
+void main() {
+    out_color = frag_color;
+}
+"""
+
+RECORD = struct.Struct('=6f')
+
+
+@pytest.fixture
+def vertex_data(gl):
+    from easygl.arrays import VertexArrayData, DType, attribute
+    data = VertexArrayData()
+    with data.definition():
+        attribute('position', DType.float_v2)
+        attribute('color', DType.float_v4)
+    return data
+
+
+@pytest.fixture
+def program(gl, vertex_data):
+    from easygl.shaders import ShaderProgramData
+    shader_data = ShaderProgramData('')
+    shader_data.compile_vertex_shader('test', shader_code=VERTEX_SHADER)
+    shader_data.compile_fragment_shader('test', shader_code=FRAGMENT_SHADER)
+    shader_data.link('test', vertex_data, vertex='test', fragment='test')
+    return shader_data.build('test')
+
+
+def records(count, first=0):
+    # distinct values for every vertex, so that misplaced or garbled bytes show
+    return b''.join(RECORD.pack(i, -i, i / 2., i / 4., i / 8., 1.) for i in range(first, first + count))
+
+
+def test_arena_upload(gl, vertex_data, program, read_buffer):
+    from easygl.arrays import VertexArray
+    arena = vertex_data.new_arena('arena', 4)
+    for i in range(3):
+        arena.append(position=(i, -i), color=(i / 2., i / 4., i / 8., 1.))
+    vertex_array = VertexArray(vertex_data, 'arena', program)
+    assert read_buffer(vertex_array.vbo, 3 * RECORD.size) == records(3)
+
+    # grown past the GL buffer's capacity, so the buffer is reallocated as well
+    for i in range(3, 40):
+        arena.append(position=(i, -i), color=(i / 2., i / 4., i / 8., 1.))
+    vertex_array.sync_arena()
+    assert read_buffer(vertex_array.vbo, 40 * RECORD.size) == records(40)
+    vertex_array.release()
+
+
+@pytest.mark.parametrize('numpy', [True, False], ids=['numpy', 'no-numpy'])
+def test_cached_geometry_upload(gl, vertex_data, program, read_buffer, tmp_path, monkeypatch, numpy):
+    from easygl.arrays import VertexArrayData, VertexArray, GeometryCache, attribute, arraybuffers
+    if not numpy:
+        monkeypatch.setattr(arraybuffers, 'np', None)
+    vertex_data.set_primitive('quad', records(4))
+    vertex_data.index_primitive('quad', [0, 1, 2, 2, 3, 0])
+    cache = GeometryCache(str(tmp_path))
+    cache.store(vertex_data, '1')
+
+    # a fresh VertexArrayData, filled with read-only views over the mapped file
+    loaded = VertexArrayData()
+    with loaded.definition():
+        for name in vertex_data.names:
+            attribute(name, vertex_data.dtype(name))
+    assert cache.load(loaded, '1')
+    assert isinstance(loaded['quad'], memoryview)
+    vertex_array = VertexArray(loaded, 'quad', program)
+    assert read_buffer(vertex_array.vbo, 4 * RECORD.size) == records(4)
+    assert read_buffer(vertex_array.ebo, 6) == bytes([0, 1, 2, 2, 3, 0])
+    vertex_array.release()
+
+
+@pytest.mark.parametrize('mapped', [True, False], ids=['mapped', 'orphaning'])
+def test_streaming_upload(gl, vertex_data, program, read_buffer, mapped):
+    from easygl.arrays import StreamingVertexArray
+    stream = StreamingVertexArray(vertex_data, program, 8, segments=2, mapped=mapped)
+    first = stream.write(bytearray(records(3)))
+    second = stream.write(memoryview(records(3, 3)))
+    assert (first, second) == (0, 3)
+    assert read_buffer(stream.vbo, 6 * RECORD.size) == records(6)
+
+    # doesn't fit in what's left of the segment: the next segment is entered (or the buffer orphaned)
+    third = stream.write(bytearray(records(4, 6)))
+    assert third == (8 if mapped else 0)
+    assert read_buffer(stream.vbo, 4 * RECORD.size, third * RECORD.size) == records(4, 6)
+    stream.release()
+
+
+def test_streaming_upload_without_mapping(gl, vertex_data, program, read_buffer, monkeypatch):
+    from easygl.arrays import StreamingVertexArray, arraybuffers
+    stream = StreamingVertexArray(vertex_data, program, 8, segments=2)
+    # a failed mapping (NULL pointer) falls back to glBufferSubData
+    monkeypatch.setattr(arraybuffers.GL, 'glMapBufferRange', lambda *args: None)
+    assert stream.write(bytearray(records(3))) == 0
+    assert read_buffer(stream.vbo, 3 * RECORD.size) == records(3)
+    monkeypatch.undo()
+    stream.release()
+
+
+def test_set_vertex_keeps_other_attributes(gl, vertex_data, program, read_buffer):
+    from easygl.arrays import VertexArray
+    vertex_data.set_primitive('points', records(4))
+    vertex_array = VertexArray(vertex_data, 'points', program)
+    vertex_array.set_vertex(1, position=(10., 20.))
+    vertex_array.set_vertex(2, color=(.5, .5, .5, .5))
+    vertex_array.flush()
+
+    expected = records(1) + RECORD.pack(10., 20., .5, .25, .125, 1.) + RECORD.pack(2., -2., .5, .5, .5, .5) + \
+        records(1, 3)
+    assert read_buffer(vertex_array.vbo, 4 * RECORD.size) == expected
+    vertex_array.release()
+
+
+def test_flush_uploads_dirty_ranges(gl, vertex_data, program, read_buffer):
+    from easygl.arrays import VertexArray
+    vertex_data.set_primitive('points', records(64))
+    vertex_array = VertexArray(vertex_data, 'points', program)
+    # far enough apart not to be merged
+    vertex_array.write_vertices(2, records(2, 100))
+    vertex_array.write_vertices(50, records(3, 200))
+    assert vertex_array.flush() == 2
+    assert not vertex_array.dirty
+
+    expected = records(2) + records(2, 100) + records(46, 4) + records(3, 200) + records(11, 53)
+    assert read_buffer(vertex_array.vbo, 64 * RECORD.size) == expected
+    vertex_array.release()
+
+
+def test_mark_dirty_without_mirror(gl, vertex_data, program, read_buffer):
+    from easygl.arrays import VertexArray
+    vertex_data.set_primitive('points', records(4))
+    vertex_array = VertexArray(vertex_data, 'points', program)
+    # no mirror yet: marking makes one, and the current data is uploaded
+    vertex_array.mark_dirty(1, 2)
+    assert vertex_array.flush() == 1
+    assert read_buffer(vertex_array.vbo, 4 * RECORD.size) == records(4)
+    with pytest.raises(IndexError):
+        vertex_array.mark_dirty(3, 2)
+    vertex_array.release()
+
+
+INSTANCED_VERTEX_SHADER = """
+#version 330 core
+in vec2 position;
+in vec4 color;
+in vec2 offset;
+out vec4 frag_color;
+void main() {
+    frag_color = color;
+    gl_Position = vec4(position + offset, 0., 1.);
+}
+"""
+
+
+def element_buffer_binding(gl, vertex_array):
+    from easygl.glstate import gl_state
+    gl_state.bind_vertex_array(vertex_array.vao)
+    binding = gl.glGetIntegerv(gl.GL_ELEMENT_ARRAY_BUFFER_BINDING)
+    gl_state.bind_vertex_array(0)
+    return binding
+
+
+def test_strips_dont_leak_into_shared_vao(gl, vertex_data, program):
+    from easygl.arrays import VertexArray
+    vertex_data.set_primitive('points', records(8))
+    first = VertexArray(vertex_data, 'points', program)
+    second = VertexArray(vertex_data, 'points', program)
+    assert first.vao == second.vao
+
+    first.set_strips([(0, 4), (4, 4)])
+    assert first.vao != second.vao
+    assert first.vbo == second.vbo
+    assert second.ebo is None
+    assert element_buffer_binding(gl, first) == first.ebo
+    assert element_buffer_binding(gl, second) == 0
+
+    # new VertexArray objects share the untouched VAO
+    third = VertexArray(vertex_data, 'points', program)
+    assert third.vao == second.vao
+
+    # the vertex buffer is released (to the pool) with the last of them
+    from easygl.resources import buffer_pool
+    buffer_pool.clear()
+    free = buffer_pool.free_count()
+    for vertex_array in (second, third):
+        vertex_array.release()
+        assert buffer_pool.free_count() == free
+    first.release()
+    assert buffer_pool.free_count() == free + 1
+
+
+def test_instances_dont_leak_into_shared_vao(gl, vertex_data, read_buffer):
+    from easygl.arrays import VertexArrayData, VertexArray, DType, attribute
+    from easygl.glstate import gl_state
+    from easygl.shaders import ShaderProgramData
+    instance_data = VertexArrayData()
+    with instance_data.definition():
+        attribute('offset', DType.float_v2)
+    shader_data = ShaderProgramData('')
+    shader_data.compile_vertex_shader('test', shader_code=INSTANCED_VERTEX_SHADER)
+    shader_data.compile_fragment_shader('test', shader_code=FRAGMENT_SHADER)
+    shader_data.link('test', (vertex_data, instance_data), vertex='test', fragment='test')
+    program = shader_data.build('test')
+    location = program.attribute_locations['offset']
+
+    vertex_data.set_primitive('points', records(4))
+    first = VertexArray(vertex_data, 'points', program)
+    second = VertexArray(vertex_data, 'points', program)
+    first.set_instances(instance_data, struct.pack('=4f', 1., 2., 3., 4.))
+    assert first.vao != second.vao
+    assert second.ibo is None and second.instance_count == 0
+
+    for vertex_array, enabled in ((first, 1), (second, 0)):
+        gl_state.bind_vertex_array(vertex_array.vao)
+        value = gl.GLint()
+        gl.glGetVertexAttribiv(location, gl.GL_VERTEX_ATTRIB_ARRAY_ENABLED, ctypes.byref(value))
+        assert value.value == enabled
+    gl_state.bind_vertex_array(0)
+
+    # updated in place, even from the first instance: the rest of the buffer and the instance count are kept
+    first.update_instances(struct.pack('=2f', 5., 6.))
+    assert read_buffer(first.ibo, 16) == struct.pack('=4f', 5., 6., 3., 4.)
+    assert first.instance_count == 2
+    with pytest.raises(ValueError):
+        first.update_instances(struct.pack('=4f', 7., 8., 9., 10.), 1)
+    first.release()
+    second.release()
+
+
+def test_vertex_buffer_sizes(gl, vertex_data, program):
+    from easygl.arrays import VertexArray
+    from easygl.resources import buffer_pool
+    buffer_pool.clear()
+    small = 10
+    large = VertexArray.POOLED_SIZE // RECORD.size + 1
+    vertex_data.set_primitive('small', records(small))
+    vertex_data.set_primitive('large', records(large))
+
+    sizes = {}
+    for name in ('small', 'large'):
+        vertex_array = VertexArray(vertex_data, name, program)
+        gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, vertex_array.vbo)
+        sizes[name] = gl.glGetBufferParameteriv(gl.GL_COPY_READ_BUFFER, gl.GL_BUFFER_SIZE)
+        gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, 0)
+        vertex_array.release()
+    # the small one is rounded up to its size class and pooled when released, the large one isn't
+    assert sizes == {'small': 256, 'large': large * RECORD.size}
+    assert buffer_pool.free_count() == 1
+
+
+CAPTURE_VERTEX_SHADER = """
+#version 330 core
+in vec2 position;
+in vec4 color;
+out vec2 next_position;
+out vec4 next_color;
+void main() {
+    next_position = position * 2.;
+    next_color = color.wzyx;
+}
+"""
+
+
+def test_capture(gl, vertex_data, read_buffer):
+    from easygl.arrays import VertexArray
+    from easygl.shaders import ShaderProgramData
+    shader_data = ShaderProgramData('')
+    shader_data.compile_vertex_shader('capture', shader_code=CAPTURE_VERTEX_SHADER)
+    shader_data.link('capture', vertex_data, ('next_position', 'next_color'), vertex='capture')
+    program = shader_data.build('capture')
+
+    vertex_data.set_primitive('source', records(5))
+    vertex_data.set_primitive('target', bytes(5 * RECORD.size))
+    source = VertexArray(vertex_data, 'source', program)
+    target = VertexArray(vertex_data, 'target', program)
+    program.use()
+    source.capture(target)
+
+    expected = b''.join(RECORD.pack(2 * i, -2 * i, 1., i / 8., i / 4., i / 2.) for i in range(5))
+    assert read_buffer(target.vbo, 5 * RECORD.size) == expected
+    source.release()
+    target.release()
+
+
+@pytest.mark.parametrize('kind', ['ndarray', 'memoryview'])
+def test_multi_draw_read_only_ranges(gl, vertex_data, read_buffer, kind):
+    from array import array
+    from easygl.arrays import VertexArray
+    from easygl.shaders import ShaderProgramData
+    shader_data = ShaderProgramData('')
+    shader_data.compile_vertex_shader('capture', shader_code=CAPTURE_VERTEX_SHADER)
+    shader_data.link('capture', vertex_data, ('next_position', 'next_color'), vertex='capture')
+    program = shader_data.build('capture')
+
+    # read-only ranges, as when they're read from a memory-mapped file
+    if kind == 'ndarray':
+        np = pytest.importorskip('numpy')
+        firsts, counts = np.array([1, 4], np.int32), np.array([2, 1], np.int32)
+        firsts.flags.writeable = counts.flags.writeable = False
+    else:
+        firsts, counts = memoryview(array('i', [1, 4])).toreadonly(), memoryview(array('i', [2, 1])).toreadonly()
+
+    vertex_data.set_primitive('source', records(5))
+    vertex_data.set_primitive('target', bytes(3 * RECORD.size))
+    source = VertexArray(vertex_data, 'source', program)
+    target = VertexArray(vertex_data, 'target', program)
+    program.use()
+    gl.glEnable(gl.GL_RASTERIZER_DISCARD)
+    gl.glBindBufferBase(gl.GL_TRANSFORM_FEEDBACK_BUFFER, 0, target.vbo)
+    gl.glBeginTransformFeedback(gl.GL_POINTS)
+    try:
+        source.multi_draw_arrays(gl.GL_POINTS, firsts, counts)
+    finally:
+        gl.glEndTransformFeedback()
+        gl.glBindBufferBase(gl.GL_TRANSFORM_FEEDBACK_BUFFER, 0, 0)
+        gl.glDisable(gl.GL_RASTERIZER_DISCARD)
+
+    expected = b''.join(RECORD.pack(2 * i, -2 * i, 1., i / 8., i / 4., i / 2.) for i in (1, 2, 4))
+    assert read_buffer(target.vbo, 3 * RECORD.size) == expected
+    source.release()
+    target.release()
@@ -0,0 +1,54 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import struct
+import pytest
+from easygl.arrays import VertexArrayData, DType, attribute, bake
+
+RECORD = struct.Struct('=2fB')
+
+
+def row(y, count):
+    # runs in the worker processes
+    return [dict(position=(x, y), flag=x % 2) for x in range(count)]
+
+
+@pytest.mark.parametrize('planar', [False, True], ids=['interleaved', 'planar'])
+def test_bake(planar):
+    data = VertexArrayData(planar)
+    with data.definition():
+        attribute('position', DType.float_v2)
+        attribute('flag', DType.ubyte)
+    bake(data, [('grid', row, (0, 3)), ('empty', row, (0, 0)), ('grid', row, (1, 2)), ('line', row, (5, 1))], 2)
+
+    expected = b''.join(RECORD.pack(x, y, x % 2) for y, count in ((0, 3), (1, 2)) for x in range(count))
+    grid = data.layout.to_interleaved(data['grid']) if planar else data['grid']
+    assert grid == expected
+    assert data['empty'] == b''
+    assert len(data['line']) == RECORD.size
@@ -0,0 +1,69 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import pytest
+from easygl.arrays import DType, DTypeInfo, pack_int_2_10_10_10_rev
+
+
+def test_quantize():
+    assert DType.nubyte_v4.quantize((0., .5, 1., 2.)) == (0, 128, 255, 255)
+    assert DType.nubyte.quantize(-1.) == (0,)
+    assert DType.nushort_v2.quantize((.5, 1.)) == (32768, 65535)
+
+
+def test_pack_int_2_10_10_10_rev():
+    assert pack_int_2_10_10_10_rev(0., 0., 0., 0.) == 0
+    # two's complement fields, x in the low bits and w in the top two
+    assert pack_int_2_10_10_10_rev(1., -1., 0., -1.) == 0x1ff | 0x201 << 10 | 0x3 << 30
+    assert pack_int_2_10_10_10_rev(2., 0., -2., 1.) == 0x1ff | 0x201 << 20 | 0x1 << 30
+    assert DType.int_2_10_10_10_rev.quantize((0., 0., 1., 0.)) == (0x1ff << 20,)
+    assert DType.int_2_10_10_10_rev.components == 1
+
+
+def test_lookup():
+    assert DType.lookup('float_v3') is DType.float_v3
+    assert DType.lookup('int_2_10_10_10_rev') is DType.int_2_10_10_10_rev
+    with pytest.raises(KeyError):
+        DType.lookup('float_v5')
+
+
+def test_identity():
+    # an equal copy is not a DType member
+    copy = DTypeInfo(*DType.float)
+    assert copy == copy and copy != DType.float
+    assert DType.float in DType and copy not in DType
+    assert {DType.float: 1}.get(copy) is None
+    assert len({DType.uint, DType.uint_v2, DType.uint}) == 2
+
+
+def test_packer():
+    packer = DType.float_v2.packer(3)
+    assert packer is DType.float_v2.packer(3)
+    assert packer.format == '=ffffff'
+    assert DType.half.packer().size == 2
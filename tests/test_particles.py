@@ -0,0 +1,75 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import struct
+import pytest
+
+PARTICLE = struct.Struct('=6f')
+
+
+@pytest.fixture
+def particles(gl):
+    # easygl.display needs pygame
+    pytest.importorskip('pygame')
+    from easygl.prefabs import particles
+    return particles
+
+
+def read_particles(gl, read_buffer, system):
+    data = read_buffer(system.vertex_array.vbo, system.capacity * PARTICLE.size)
+    return [PARTICLE.unpack_from(data, i * PARTICLE.size) for i in range(system.capacity)]
+
+
+def test_particles_simulate_on_the_gpu(gl, read_buffer, particles):
+    system = particles.ParticleSystem(4)
+    system.emit((0., 0.), (1., 2.), 1.)
+    system.emit((5., 5.), (0., 0.), .25)
+
+    delta, gravity, drag = .1, (0., -10.), .5
+    expected = [[0., 0., 1., 2., 1.], [5., 5., 0., 0., .25]]
+    for _ in range(4):
+        system.update(delta, gravity, drag)
+        for particle in expected:
+            x, y, vx, vy, life = particle
+            if life <= 0.:
+                # dead particles stay where they are, with no time left
+                particle[4] = 0.
+                continue
+            scale = max(0., 1. - drag * delta)
+            vx, vy = (vx + gravity[0] * delta) * scale, (vy + gravity[1] * delta) * scale
+            particle[:] = x + vx * delta, y + vy * delta, vx, vy, life - delta
+
+    captured = read_particles(gl, read_buffer, system)
+    for particle, values, total in zip(captured, expected, (1., .25)):
+        assert particle == pytest.approx(tuple(values) + (total,), abs=1e-5)
+    # the second particle ran out of time on the third step, and didn't move on the fourth
+    assert captured[1][4] == 0.
+    # the unused slots stay dead
+    assert all(particle == (0.,) * 6 for particle in captured[2:])
+    system.release()
@@ -0,0 +1,130 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import struct
+import pytest
+from easygl.arrays import VertexArrayData, DType, attribute, vertex, vertex_copy
+
+# position float_v2, color nubyte_v4, normal int_2_10_10_10_rev
+RECORD = struct.Struct('=2f4BI')
+
+POSITIONS = [(0., 1.), (2., 3.), (4., 5.)]
+COLORS = [(0., .5, 1., 1.), (1., 0., 0., 1.), (0., 0., 1., .25)]
+NORMALS = [(0., 0., 1., 0.), (1., -1., 0., 1.), (-1., 0., .5, -1.)]
+
+
+def make_vertex_data(planar=False):
+    data = VertexArrayData(planar)
+    with data.definition():
+        attribute('position', DType.float_v2)
+        attribute('color', DType.nubyte_v4)
+        attribute('normal', DType.int_2_10_10_10_rev)
+    return data
+
+
+def built(data, name, count):
+    with data.new_primitive(name, count):
+        for position, color, normal in zip(POSITIONS, COLORS, NORMALS):
+            vertex(position=position, color=color, normal=normal)
+    return data[name]
+
+
+def test_vertex_writer():
+    data = make_vertex_data()
+    with data.new_primitive('tri', 3, color=(1., 1., 1., 1.)):
+        vertex(position=(1., 2.))
+        # attributes not given keep their last value
+        vertex(position=(3., 4.), normal=(0., 0., 1., 0.))
+        vertex_copy(0)
+        # the primitive is full
+        assert vertex(position=(5., 6.))
+
+    assert data['tri'] == b''.join((
+        RECORD.pack(1., 2., 255, 255, 255, 255, 0),
+        RECORD.pack(3., 4., 255, 255, 255, 255, 511 << 20),
+        RECORD.pack(1., 2., 255, 255, 255, 255, 0),
+    ))
+    assert data.layout.stride == RECORD.size
+
+
+def test_growable_primitive():
+    data = make_vertex_data()
+    with data.new_primitive('open'):
+        for i in range(40):
+            assert not vertex(position=(i, -i))
+    assert len(data['open']) == 40 * RECORD.size
+    assert RECORD.unpack_from(data['open'], 39 * RECORD.size)[:2] == (39., -39.)
+
+
+@pytest.mark.parametrize('planar', [False, True], ids=['interleaved', 'planar'])
+def test_primitive_from_arrays(planar):
+    np = pytest.importorskip('numpy')
+    data = make_vertex_data(planar)
+    data.new_primitive_from_arrays('tri', position=np.array(POSITIONS), color=COLORS, normal=NORMALS)
+    assert data['tri'] == built(data, 'expected', 3)
+
+    # single values are broadcast to every vertex
+    data.new_primitive_from_arrays('flat', 3, position=POSITIONS, color=(0., .5, 1., 1.), normal=(0., 0., 1., 0.))
+    flat = data.layout.to_interleaved(data['flat']) if planar else data['flat']
+    for i, position in enumerate(POSITIONS):
+        assert RECORD.unpack_from(flat, i * RECORD.size) == position + (0, 128, 255, 255, 511 << 20)
+
+
+def test_primitive_from_arrays_errors():
+    pytest.importorskip('numpy')
+    data = make_vertex_data()
+    with pytest.raises(ValueError):
+        data.new_primitive_from_arrays('tri', position=POSITIONS, texcoord=POSITIONS)
+    with pytest.raises(ValueError):
+        data.new_primitive_from_arrays('tri', position=POSITIONS, color=COLORS[:2])
+    with pytest.raises(ValueError):
+        data.new_primitive_from_arrays('tri', color=(1., 1., 1., 1.))
+
+
+@pytest.mark.parametrize('planar', [False, True], ids=['interleaved', 'planar'])
+def test_index_and_weld(planar):
+    data = make_vertex_data(planar)
+    records = [RECORD.pack(i, i, 0, 0, 0, 0, 0) for i in (0, 1, 2, 1, 0, 3)]
+    data.set_primitive('quad', b''.join(records))
+
+    index_data = data.index_primitive('quad', [0, 1, 2, 3, 4, 5, 5])
+    assert index_data.dtype is DType.ubyte
+    assert (index_data.count, index_data.data) == (7, bytes([0, 1, 2, 3, 4, 5, 5]))
+
+    # duplicated records are merged into the first one, and the indices follow them
+    index_data = data.index_primitive('quad', weld=True)
+    assert (index_data.count, index_data.data) == (6, bytes([0, 1, 2, 1, 0, 3]))
+    assert data.index_data('quad') is index_data
+    welded = data.layout.to_interleaved(data['quad']) if planar else data['quad']
+    assert welded == b''.join(records[:3] + records[5:])
+
+    with pytest.raises(ValueError):
+        data.index_primitive('quad', [0, 4])
+    with pytest.raises(KeyError):
+        data.index_primitive('missing')
@@ -0,0 +1,98 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import pytest
+# easygl.shaders and easygl.arrays import each other: arrays has to come first
+import easygl.arrays
+
+VERTEX_SHADER = """
+#version 330 core
+in vec2 position;
+void main() {
+    gl_Position = vec4(position, 0., 1.);
+}
+"""
+
+# unique per test, so that no shader or program is shared with another test's
+BROKEN_SHADER = """
+#version 330 core
+void main() {{
+    gl_Position = {};
+}}
+"""
+
+
+def test_shared_shader_compile_status(gl):
+    from easygl.shaders import ShaderProgramData, ShaderCompileError
+    code = BROKEN_SHADER.format('undefined_shared')
+    # not checked when compiled deferred...
+    deferred = ShaderProgramData('', deferred=True)
+    deferred.compile_vertex_shader('broken', shader_code=code)
+    # ...but by every other object sharing it
+    for _ in range(2):
+        with pytest.raises(ShaderCompileError):
+            ShaderProgramData('').compile_vertex_shader('broken', shader_code=code)
+    deferred.release()
+
+
+def test_failed_link_releases_the_program(gl, tmp_path, monkeypatch):
+    from easygl.shaders import ShaderProgramData, ShaderCompileError, ProgramCache, builder
+    created = []
+    create_program = gl.glCreateProgram
+
+    def record():
+        created.append(create_program())
+        return created[-1]
+    monkeypatch.setattr(builder.GL, 'glCreateProgram', record)
+
+    # with a cache, shaders are compiled by link(), after the program is made
+    shader_data = ShaderProgramData('', cache=ProgramCache(str(tmp_path)))
+    shader_data.compile_vertex_shader('broken', shader_code=BROKEN_SHADER.format('undefined_link'))
+    with pytest.raises(ShaderCompileError):
+        shader_data.link('broken', vertex='broken')
+    assert created and not any(gl.glIsProgram(program) for program in created)
+
+    shader_data.compile_vertex_shader('working', shader_code=VERTEX_SHADER)
+    shader_data.link('working', vertex='working')
+    assert gl.glIsProgram(created[-1])
+    shader_data.release()
+
+
+def test_shared_program_link_error(gl):
+    from easygl.shaders import ShaderProgramData, ShaderCompileError
+    code = BROKEN_SHADER.format('undefined_deferred')
+    first, second = ShaderProgramData('', deferred=True), ShaderProgramData('', deferred=True)
+    for shader_data in (first, second):
+        shader_data.compile_vertex_shader('broken', shader_code=code)
+        shader_data.link('broken', vertex='broken')
+    # both share the program, and get its error
+    for shader_data in (first, second):
+        with pytest.raises(ShaderCompileError):
+            shader_data.build('broken')
+        shader_data.release()
@@ -0,0 +1,69 @@
+# !/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2017 Jorge A. Gomes (jorgegomes83 at hotmail dot com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+import struct
+import pytest
+
+COORD = struct.Struct('=2f')
+
+
+@pytest.fixture
+def sprite(gl):
+    # easygl.display needs pygame
+    pytest.importorskip('pygame')
+    from easygl.prefabs import sprite
+    sprite.init()
+    return sprite
+
+
+def test_subimage_texcoords(gl, read_buffer, sprite):
+    from easygl.arrays import VertexArrayData, VertexArray, DType, attribute
+    # the sprite vertex shader, with its texture coordinates captured instead of rasterized
+    sprite.SpriteShaderData.link('anim_sprite_coords', sprite.AnimatedVertexData, ('coord',), vertex='anim_sprite')
+    program = sprite.SpriteShaderData.build('anim_sprite_coords')
+
+    coords = VertexArrayData()
+    with coords.definition():
+        attribute('coord', DType.float_v2)
+    coords.set_primitive('coords', bytes(4 * COORD.size))
+    source = VertexArray(sprite.AnimatedVertexData, 'anim_sprite', program)
+    target = VertexArray(coords, 'coords', program)
+    program.use()
+    left, top, right, bottom = .25, .75, .5, 0.
+    program.load4f('lefttoprightbottom', left, top, right, bottom)
+    source.capture(target)
+
+    # every corner of the quad gets the matching corner of the subimage
+    data = read_buffer(target.vbo, 4 * COORD.size)
+    positions = sprite.AnimatedVertexData['anim_sprite']
+    for i in range(4):
+        x, y = COORD.unpack_from(positions, i * COORD.size)
+        assert COORD.unpack_from(data, i * COORD.size) == (right if x > 0 else left, top if y > 0 else bottom)
+    source.release()
+    target.release()